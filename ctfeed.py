@@ -34,6 +34,13 @@ async def lifespan(app:FastAPI):
         logger.critical(f"fail to initialize database: {str(e)}")
         raise
     
+    ## listen for unlocked Events
+    try:
+        await crud.unlock_notifier.start(database.engine)
+    except Exception as e:
+        # waiters fall back to polling
+        logger.error(f"fail to listen for unlocked Events: {str(e)}")
+    
     ## initialize config
     try:
         async with database.with_get_db() as session:
@@ -61,11 +68,23 @@ async def lifespan(app:FastAPI):
     ## stop discord bot
     await bot.stop_bot()
     
+    ## stop listening for unlocked Events
+    try:
+        await crud.unlock_notifier.stop()
+    except Exception as e:
+        logger.critical(f"fail to stop listening for unlocked Events: {str(e)}")
+    
     ## close aiohttp.ClientSession in src.utils.ctf_api
     try:
         await ctf_api.close_session()
     except Exception as e:
         logger.critical(f"fail to stop aiohttp.ClientSession in src.utils.ctf_api")
+    
+    ## close database connection pools
+    try:
+        await database.dispose_engines()
+    except Exception as e:
+        logger.critical(f"fail to close database connection pools: {str(e)}")
 
 
 # app
@@ -96,6 +115,7 @@ app.include_router(router.user_router)
 app.include_router(router.ctf_router)
 app.include_router(router.config_router)
 app.include_router(router.guild_router)
+app.include_router(router.metrics_router)
 
 # index
 @app.get("/", tags=["Shirakami Fubuki"])
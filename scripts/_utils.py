@@ -0,0 +1,32 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+import sqlalchemy
+
+# statement counter
+class StatementCounter:
+    def __init__(self):
+        self.statements:List[str] = []
+    
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_statements(engine:AsyncEngine) -> Iterator[StatementCounter]:
+    """
+    Count the SQL statements sent through ``engine``.
+    """
+    counter = StatementCounter()
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+    
+    sqlalchemy.event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        sqlalchemy.event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
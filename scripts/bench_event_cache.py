@@ -0,0 +1,61 @@
+"""
+Measure the database queries saved by ``src.crud.event_cache`` under menu browsing (user-021).
+
+```
+uv run python -m scripts.bench_event_cache [reads] [write_every]
+```
+
+It reads ``DATABASE_URL`` from ``.env`` and needs some Events in database (nothing is written).
+``reads`` random ``read_event_one(lock=False)`` calls (like ``EventDetailMenu`` and ``GET /event/{id}``) are made over the Events:
+- ``no cache``: the cache is cleared before every read
+- ``cache``: every ``write_every`` reads, one random Event is invalidated (like ``join_event``), the others stay cached
+"""
+import asyncio
+import random
+import sys
+import time
+
+import sqlalchemy
+
+from src.database import database
+from src.database.model import Event
+from src import crud
+from scripts._utils import count_statements
+
+# browsing
+async def browse(ids, reads:int, write_every:int, cache:bool):
+    crud.event_cache.invalidate()
+    start = time.perf_counter()
+    with count_statements(database.engine) as counter:
+        async with database.with_get_db() as session:
+            for i in range(reads):
+                if not cache:
+                    crud.event_cache.invalidate()
+                elif write_every > 0 and i % write_every == 0:
+                    crud.event_cache.invalidate(id=random.choice(ids))
+                await crud.read_event_one(session, random.choice(ids), lock=False)
+    return counter.count, time.perf_counter() - start
+
+
+async def main() -> int:
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    write_every = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    
+    async with database.engine.connect() as conn:
+        ids = list((await conn.execute(sqlalchemy.select(Event.id).limit(200))).scalars().all())
+    if len(ids) == 0:
+        print("no Events in database")
+        return 1
+    
+    print(f"{reads} reads over {len(ids)} Events, one write every {write_every} reads")
+    for name, cache in (("no cache", False), ("cache", True)):
+        statements, seconds = await browse(ids, reads, write_every, cache)
+        print(f"  {name:<9} {statements:>6} statements ({statements / reads:.2f}/read), {reads / seconds:>8.0f} reads/s")
+    print(f"  {crud.event_cache.stats()}")
+    
+    await database.dispose_engines()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
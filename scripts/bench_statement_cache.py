@@ -0,0 +1,45 @@
+"""
+Measure the per-call Python overhead saved by ``src.crud.statement_cache`` (user-016).
+
+```
+uv run python -m scripts.bench_statement_cache
+```
+
+No database is needed (``.env`` is still loaded by ``src.config``). For every cached builder it compares:
+- ``rebuild``: build the statement and generate its cache key, like every call did before
+- ``cached``: get the statement from the builder cache and generate its cache key
+  (the key is memoized on the statement object, so SQLAlchemy's compiled cache lookup is free as well)
+"""
+from typing import Any, Callable, List, Tuple
+import sys
+import timeit
+
+from src.crud import event as event_crud
+from src.crud import user as user_crud
+
+# builders
+# (name, builder, arguments)
+BUILDERS:List[Tuple[str, Callable, Tuple[Any, ...]]] = [
+    ("read_event_one(lock=False)", event_crud._read_event_one_stmt, ("ctftime", False)),
+    ("read_event_one(lock=True)", event_crud._lock_event_one_stmt, ("ctftime", False)),
+    ("read_event_many(ctftime, next_page)", event_crud._read_event_many_stmt, ("ctftime", None, False, True, "next_page")),
+    ("join_event", event_crud._join_event_stmt, ()),
+    ("delete_user_in_event", event_crud._delete_user_in_event_stmt, (True,)),
+    ("read_user", user_crud._read_user_stmt, (True,)),
+]
+
+NUMBER = 2000
+
+
+def main() -> int:
+    print(f"{'statement':<40} {'rebuild':>12} {'cached':>12} {'speedup':>8}")
+    for name, builder, args in BUILDERS:
+        builder(*args)  # warm up the cache
+        rebuild = timeit.timeit(lambda builder=builder, args=args: builder.__wrapped__(*args)._generate_cache_key(), number=NUMBER) / NUMBER
+        cached = timeit.timeit(lambda builder=builder, args=args: builder(*args)._generate_cache_key(), number=NUMBER) / NUMBER
+        print(f"{name:<40} {rebuild * 1e6:>9.1f} us {cached * 1e6:>9.1f} us {rebuild / cached:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
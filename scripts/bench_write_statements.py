@@ -0,0 +1,80 @@
+"""
+Count the statements of the crud write flows (user-015: results are built from ``RETURNING`` alone).
+
+```
+uv run python -m scripts.bench_write_statements
+```
+
+It reads ``DATABASE_URL`` from ``.env``, runs a create / lock / update / unlock flow twice and removes the rows it created:
+- ``returning``: the current crud functions
+- ``refresh``: the same flow with ``session.refresh()`` after every write (how the crud functions worked before)
+"""
+import asyncio
+import random
+import sys
+
+import sqlalchemy
+
+from src.database import database
+from src.database.model import Event, User, Status
+from src import crud
+from scripts._utils import count_statements
+
+# flow
+async def flow(refresh:bool) -> int:
+    discord_id = random.randint(10**17, 10**18)
+    event_id = -random.randint(1, 10**9)   # negative, never conflicts with CTFTime
+    event_db_id = None
+    
+    try:
+        with count_statements(database.engine) as counter:
+            async with database.with_get_db() as session:
+                # create
+                async with session.begin():
+                    user = await crud.create_user(session, discord_id)
+                    if refresh:
+                        await session.flush()
+                        await session.refresh(user)
+                    event = await crud.create_event(session, "bench", event_id=event_id, start=0, finish=1)
+                    if refresh:
+                        await session.flush()
+                        await session.refresh(event)
+                    event_db_id = event.id
+                
+                # lock, update and unlock
+                event, lock_owner_token = await crud.read_event_one(session, event_db_id, lock=True, duration=15)
+                try:
+                    async with session.begin():
+                        event = await crud.update_event(session, event_db_id, lock_owner_token, title="bench (updated)")
+                        if refresh:
+                            await session.flush()
+                            await session.refresh(event)
+                        user = await crud.update_user(session, discord_id, status=Status.offline)
+                        if refresh:
+                            await session.flush()
+                            await session.refresh(user)
+                finally:
+                    await crud.unlock_event(session, event_db_id, lock_owner_token)
+        return counter.count
+    finally:
+        # clean up
+        async with database.engine.begin() as conn:
+            await conn.execute(sqlalchemy.delete(Event).where(Event.event_id == event_id))
+            await conn.execute(sqlalchemy.delete(User).where(User.discord_id == discord_id))
+
+
+async def main() -> int:
+    await database.init_db()
+    
+    returning = await flow(refresh=False)
+    refresh = await flow(refresh=True)
+    print("create_user + create_event + lock + update_event + update_user + unlock")
+    print(f"  refresh:   {refresh} statements")
+    print(f"  returning: {returning} statements ({refresh - returning} fewer)")
+    
+    await database.dispose_engines()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
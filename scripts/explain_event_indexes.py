@@ -0,0 +1,96 @@
+"""
+Check that the hot Event queries use the indexes in ``src/database/model.py`` (EXPLAIN on PostgreSQL).
+
+```
+uv run python -m scripts.explain_event_indexes
+```
+
+It reads ``DATABASE_URL`` from ``.env``. Sequential scans are disabled in a rolled back transaction,
+so the planner picks an index whenever the query can use it (even on an almost empty database).
+Plans are printed, and the exit status is 1 when a query doesn't use the expected index.
+"""
+from typing import Any, Dict, List, Tuple
+import asyncio
+import sys
+
+from sqlalchemy.dialects import postgresql
+import sqlalchemy
+
+from src.database import database
+from src.database.model import user_event
+from src.crud import event as event_crud
+
+# queries
+# (name, statement, parameters, expected index)
+QUERIES:List[Tuple[str, sqlalchemy.Select, Dict[str, Any], str]] = [
+    (
+        "read_event_many(type=ctftime) first page",
+        event_crud._read_event_many_stmt("ctftime", None, False, False, "first_page"),
+        {"row_limit": 20},
+        "ix_events_ctftime_finish_id",
+    ),
+    (
+        "read_event_many(type=ctftime) next page",
+        event_crud._read_event_many_stmt("ctftime", None, False, False, "next_page"),
+        {"row_limit": 20, "finish_before": 1700000000, "before_id": 100},
+        "ix_events_ctftime_finish_id",
+    ),
+    (
+        "read_ctfime_events_need_archive",
+        event_crud._read_events_need_archive_stmt(),
+        {"finish_before": 1700000000},
+        "ix_events_unarchived_finish",
+    ),
+    (
+        "read_event_many(type=ctftime, archived=False) finish_after",
+        event_crud._read_event_many_stmt("ctftime", False, True, False, "finish_after"),
+        {"finish_after": 1700000000},
+        "ix_events_ctftime_unarchived_finish_id",
+    ),
+    (
+        "read_event_many(type=custom, archived=False) first page",
+        event_crud._read_event_many_stmt("custom", False, False, False, "first_page"),
+        {"row_limit": 20},
+        "ix_events_custom_unarchived_id",
+    ),
+    (
+        "Event.users (selectinload)",
+        sqlalchemy.select(user_event.c.user_discord_id).where(user_event.c.event_db_id.in_([1, 2, 3])),
+        {},
+        "ix_user_event_event_db_id",
+    ),
+]
+
+
+def _to_sql(stmt:sqlalchemy.Select, params:Dict[str, Any]) -> str:
+    if len(params) != 0:
+        stmt = stmt.params(**params)
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def main() -> int:
+    if database.engine.dialect.name != "postgresql":
+        print(f"PostgreSQL is required (DATABASE_URL is {database.engine.dialect.name})")
+        return 1
+    
+    await database.init_db()
+    
+    failed = 0
+    async with database.engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            await conn.execute(sqlalchemy.text("SET LOCAL enable_seqscan = off"))
+            for name, stmt, params, index in QUERIES:
+                plan = "\n".join((await conn.execute(sqlalchemy.text(f"EXPLAIN {_to_sql(stmt, params)}"))).scalars().all())
+                ok = index in plan
+                failed += 0 if ok else 1
+                print(f"[{'OK' if ok else 'FAIL'}] {name} -> {index}\n{plan}\n")
+        finally:
+            await trans.rollback()
+    
+    await database.dispose_engines()
+    return 1 if failed != 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,4 +1,5 @@
 from typing import Optional, Dict, Any, Tuple
+from contextlib import nullcontext
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,7 +7,7 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
 import discord
 
-from src.config import settings
+from src.config import settings, get_config
 from src.database import database
 from src.database import model
 from src.utils import notification
@@ -14,6 +15,7 @@ from src.utils import get_category
 from src.utils import ctf_api
 from src.utils import embed_creator
 from src.bot import get_guild
+from src.backend.lock import keep_event_lock
 from src import crud
 
 # channel_op = "event_op"
@@ -26,9 +28,10 @@ async def read_event_one_wrapper(session:AsyncSession, event_db_id:int) -> Tuple
     try:
         event_db, lock_owner_token = await crud.read_event_one(
             session=session,
-            lock=True, duration=120,
+            lock=True, duration=settings.EVENT_LOCK_DURATION_SECONDS,
             archived=False, # ensoure the Event isn't archived
-            id=event_db_id
+            id=event_db_id,
+            wait=settings.EVENT_LOCK_WAIT_SECONDS
         )
     except crud.NotFoundError:
         raise HTTPException(404, f"Event (id={event_db_id}) not found (archived, or invalid id)")
@@ -54,9 +57,10 @@ async def _create_channel(session:AsyncSession, member:discord.Member, event_db:
     guild = get_guild()
     
     # get category
-    if (ctf_channel_category := get_category.get_category(guild, settings.CTF_CHANNEL_CATEGORY_ID)) is None:
-        logger.critical(f"CTF channel category (id={settings.CTF_CHANNEL_CATEGORY_ID}) not found")
-        raise HTTPException(500, f"CTF channel category (id={settings.CTF_CHANNEL_CATEGORY_ID}) not found")
+    config = get_config()
+    if (ctf_channel_category := get_category.get_category(guild, config.CTF_CHANNEL_CATEGORY_ID)) is None:
+        logger.critical(f"CTF channel category (id={config.CTF_CHANNEL_CATEGORY_ID}) not found")
+        raise HTTPException(500, f"CTF channel category (id={config.CTF_CHANNEL_CATEGORY_ID}) not found")
     
     try:
         async with session.begin():
@@ -74,9 +78,6 @@ async def _create_channel(session:AsyncSession, member:discord.Member, event_db:
                     raise HTTPException(404, f"Event (id={event_db.id}, event_id={event_db.event_id}) not found (CTFTime)")
                 event_api = events_api[0]
             
-            # delete old members
-            await crud.delete_user_in_event(session, id=event_db.id, lock_owner_token=lock_owner_token)
-            
             # create channel
             overwrites = {
                 guild.default_role: discord.PermissionOverwrite(view_channel=False),
@@ -85,6 +86,9 @@ async def _create_channel(session:AsyncSession, member:discord.Member, event_db:
             channel = await guild.create_text_channel(name=event_db.title, category=ctf_channel_category, overwrites=overwrites)
             
             # update database
+            # after the Discord call: delete_user_in_event() updates participant_count, and the row lock it takes
+            # would block the lease renewal (keep_event_lock) while Discord is slow
+            await crud.delete_user_in_event(session, id=event_db.id, lock_owner_token=lock_owner_token)  # delete old members
             event_db = await crud.update_event(session, event_db.id, lock_owner_token, channel_id=channel.id)
             
             created = True
@@ -192,11 +196,12 @@ async def create_and_join_channel(member:discord.Member, event_db_id:int):
         event_db, lock_owner_token = await read_event_one_wrapper(session, event_db_id)
 
         try:
-            # try to create channel
-            event_db = await _create_channel(session, member, event_db, lock_owner_token)
-            
-            # join channel
-            await _join_channel(session, member, event_db, lock_owner_token)
+            async with keep_event_lock(event_db_id, lock_owner_token):
+                # try to create channel
+                event_db = await _create_channel(session, member, event_db, lock_owner_token)
+                
+                # join channel
+                await _join_channel(session, member, event_db, lock_owner_token)
         except Exception as e:
             if isinstance(e, HTTPException):
                 raise
@@ -211,100 +216,106 @@ async def create_and_join_channel(member:discord.Member, event_db_id:int):
     return
 
 
-async def archive_event(event_db_id:int, reason:str):
+async def archive_event(event_db_id:int, reason:str, lock_owner_token:Optional[str]=None):
     """
     Archive the Event and it's channel, send notifications and remove it's scheduled event.
     
     :param event_db_id:
     :param reason:
+    :param lock_owner_token: The Event was locked by caller (for example: ``crud.lock_events_many()``), caller has to unlock it.
     
     :raise HTTPException:
     """
-    lock_owner_token = None
+    locked_by_caller = lock_owner_token is not None
     event_db_returning = {}
     
     # get guild
     guild = get_guild()
     
     # get archive category
-    if (archive_category := get_category.get_category(guild, settings.ARCHIVE_CATEGORY_ID)) is None:
-        logger.critical(f"Archive Category (id={settings.ARCHIVE_CATEGORY_ID}) not found")
-        raise HTTPException(500, f"Archive Category (id={settings.ARCHIVE_CATEGORY_ID}) not found")
+    config = get_config()
+    if (archive_category := get_category.get_category(guild, config.ARCHIVE_CATEGORY_ID)) is None:
+        logger.critical(f"Archive Category (id={config.ARCHIVE_CATEGORY_ID}) not found")
+        raise HTTPException(500, f"Archive Category (id={config.ARCHIVE_CATEGORY_ID}) not found")
     
     async with database.with_get_db() as session:
-        event_db, lock_owner_token = await read_event_one_wrapper(session, event_db_id)
+        if not locked_by_caller:
+            event_db, lock_owner_token = await read_event_one_wrapper(session, event_db_id)
         try:
-            async with session.begin():
-                # update database
-                event_db:model.Event = await crud.update_event(
-                    session=session,
-                    id=event_db.id,
-                    lock_owner_token=lock_owner_token,
-                    archived=True
+            # the caller keeps its own lock
+            async with (nullcontext() if locked_by_caller else keep_event_lock(event_db_id, lock_owner_token)):
+                async with session.begin():
+                    # update database
+                    event_db:model.Event = await crud.update_event(
+                        session=session,
+                        id=event_db_id,
+                        lock_owner_token=lock_owner_token,
+                        archived=True
+                    )
+                    
+                    # returning
+                    event_db_returning["id"] = event_db.id
+                    event_db_returning["title"] = event_db.title
+                    event_db_returning["channel_id"] = event_db.channel_id
+                    event_db_returning["scheduled_event_id"] = event_db.scheduled_event_id
+                
+                # logging
+                logger.info(f"Event {event_db_returning["title"]} (id={event_db_returning["id"]}) was archived: {reason}")
+                
+                embed = discord.Embed(
+                    title=f"{event_db_returning["title"]} was archived",
+                    description=reason,
+                    color=discord.Color.red()
                 )
+                embed.set_footer(text=f"Event ID in database: {event_db_returning["id"]}")
+                # send notification to announcement channel
+                try:
+                    await notification.send_notification("anno", embed)
+                except Exception as e:
+                    logger.error(f"fail to send notification to announcement channel: {str(e)}")
+                    # ignore exception
                 
-                # returning
-                event_db_returning["id"] = event_db.id
-                event_db_returning["title"] = event_db.title
-                event_db_returning["channel_id"] = event_db.channel_id
-                event_db_returning["scheduled_event_id"] = event_db.scheduled_event_id
-            
-            # logging
-            logger.info(f"Event {event_db_returning["title"]} (id={event_db_returning["id"]}) was archived: {reason}")
-            
-            embed = discord.Embed(
-                title=f"{event_db_returning["title"]} was archived",
-                description=reason,
-                color=discord.Color.red()
-            )
-            embed.set_footer(text=f"Event ID in database: {event_db_returning["id"]}")
-            # send notification to announcement channel
-            try:
-                await notification.send_notification("anno", embed)
-            except Exception as e:
-                logger.error(f"fail to send notification to announcement channel: {str(e)}")
-                # ignore exception
-            
-            # send notification to private channel
-            # todo:
-            # 目前策略是「移動頻道失敗時輸出 Log 讓管理員手動排解」
-            # 但這樣仍會讓 db data 跟實際狀況不同步
-            c:Optional[discord.TextChannel] = None
-            try:
-                c = await notification.send_notification(event_db_returning["channel_id"], embed)
-            except Exception as e:
-                logger.error(f"fail to send notification to channel (id={event_db_returning["channel_id"]}): {str(e)}")
-                # ignore exception
-            
-            # move channel
-            if c is not None:
+                # send notification to private channel
+                # todo:
+                # 目前策略是「移動頻道失敗時輸出 Log 讓管理員手動排解」
+                # 但這樣仍會讓 db data 跟實際狀況不同步
+                c:Optional[discord.TextChannel] = None
                 try:
-                    await c.move(
-                        category=archive_category,
-                        beginning=True,
-                        sync_permissions=True,
-                        reason=f"archived: {reason}"
-                    )
+                    c = await notification.send_notification(event_db_returning["channel_id"], embed)
                 except Exception as e:
-                    logger.error(f"fail to move channel (id={event_db_returning["channel_id"]}) to archive category: {str(e)}")
+                    logger.error(f"fail to send notification to channel (id={event_db_returning["channel_id"]}): {str(e)}")
                     # ignore exception
-            
-            # remove scheduled event
-            if (sc_id := event_db_returning["scheduled_event_id"]) is not None and \
-                (sc := guild.get_scheduled_event(sc_id)) is not None:
+                
+                # move channel
+                if c is not None:
                     try:
-                        await sc.delete()
+                        await c.move(
+                            category=archive_category,
+                            beginning=True,
+                            sync_permissions=True,
+                            reason=f"archived: {reason}"
+                        )
                     except Exception as e:
-                        logger.error(f"fail to remove scheduled event (id={event_db_returning["scheduled_event_id"]}): {str(e)}")
+                        logger.error(f"fail to move channel (id={event_db_returning["channel_id"]}) to archive category: {str(e)}")
                         # ignore exception
+                
+                # remove scheduled event
+                if (sc_id := event_db_returning["scheduled_event_id"]) is not None and \
+                    (sc := guild.get_scheduled_event(sc_id)) is not None:
+                        try:
+                            await sc.delete()
+                        except Exception as e:
+                            logger.error(f"fail to remove scheduled event (id={event_db_returning["scheduled_event_id"]}): {str(e)}")
+                            # ignore exception
         except Exception as e:
             logger.error(f"fail to archive Event (id={event_db_id}): {str(e)}")
             raise HTTPException(500, f"fail to archive Event (id={event_db_id})")
         finally:
-            try:
-                await crud.unlock_event(session, event_db_id, lock_owner_token)
-            except Exception as e:
-                logger.critical(f"fail to unlock Event (id={event_db_id}): {str(e)}")
+            if not locked_by_caller:
+                try:
+                    await crud.unlock_event(session, event_db_id, lock_owner_token)
+                except Exception as e:
+                    logger.critical(f"fail to unlock Event (id={event_db_id}): {str(e)}")
     
     return
 
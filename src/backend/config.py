@@ -1,4 +1,5 @@
 from typing import Tuple, Optional, Any
+import dataclasses
 import logging
 
 from fastapi import HTTPException
@@ -10,7 +11,8 @@ from src import crud
 from src.bot import get_guild
 from src.database import model
 from src.database import database
-from src.config import settings, settings_lock
+from src.backend import security
+from src.config import settings, ConfigSnapshot, get_config, set_config
 from src.utils.get_category import get_category
 
 # logging
@@ -66,25 +68,25 @@ async def read_config(key:Optional[str]=None) -> schema.ConfigResponse:
     
     # get config
     cache_config = {}
-    async with settings_lock:
-        if key is not None:
-            cinfo = model.config_info.get(key)
-            if cinfo is None:
-                raise HTTPException(404)
-            
+    config = get_config()
+    if key is not None:
+        cinfo = model.config_info.get(key)
+        if cinfo is None:
+            raise HTTPException(404)
+        
+        try:
+            cache_config[key] = cinfo.data_type(getattr(config, key))
+        except Exception as e:
+            errmsg = f"fail to get config (key={key}) from ConfigSnapshot (cache) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}"
+            logger.critical(errmsg)
+            raise HTTPException(500, errmsg)
+    else:
+        for k in model.config_info:
             try:
-                cache_config[key] = cinfo.data_type(getattr(settings, key))
+                cinfo = model.config_info[k]
+                cache_config[k] = cinfo.data_type(getattr(config, k))
             except Exception as e:
-                errmsg = f"fail to get config (key={key}) from settings (cache) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}"
-                logger.critical(errmsg)
-                raise HTTPException(500, errmsg)
-        else:
-            for k in model.config_info:
-                try:
-                    cinfo = model.config_info[k]
-                    cache_config[k] = cinfo.data_type(getattr(settings, k))
-                except Exception as e:
-                    logger.critical(f"fail to get config (key={k}) from settings (cache) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}")
+                logger.critical(f"fail to get config (key={k}) from ConfigSnapshot (cache) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}")
     
     # get details
     configs = []
@@ -112,13 +114,21 @@ async def read_config(key:Optional[str]=None) -> schema.ConfigResponse:
 
 
 async def update_config_cache(config:model.Config):
-    async with settings_lock:
-        for _k in model.config_info:
-            try:
-                _v = getattr(config, _k.lower())
-                setattr(settings, _k, _v)
-            except Exception as e:
-                logger.critical(f"fail to update cache of config (key={_k}) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}")
+    values = {}
+    for _k in model.config_info:
+        try:
+            if _k not in ConfigSnapshot.__dataclass_fields__:
+                raise AttributeError(f"ConfigSnapshot has no attribute {_k}")
+            values[_k] = getattr(config, _k.lower())
+        except Exception as e:
+            logger.critical(f"fail to update cache of config (key={_k}) (maybe src.database.model.Config, src.database.model.config_info and src.config are out of sync): {str(e)}")
+    
+    # swap the whole snapshot, readers never see a half-updated config
+    set_config(dataclasses.replace(get_config(), **values))
+    
+    # roles may have changed (user_role in API responses too)
+    security.invalidate_auth_cache()
+    crud.data_version.bump()
 
 
 async def update_config(kv:Optional[Tuple]):
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict, Union
 import logging
 
 import discord
@@ -7,27 +7,33 @@ import discord
 from src.database import model
 from src.backend import security
 from src import schema
+from src import crud
 
 # logging
 logger = logging.getLogger("uvicorn")
 
 
 # functions
-async def format_event(guild:discord.Guild, events_db:List[model.Event]) -> List[schema.Event]:
+async def format_event(guild:discord.Guild, events_db:List[Union[model.Event, crud.EventRecord]]) -> List[schema.Event]:
     """
     :param guild:
-    :param events_db:
+    :param events_db: Events (with ``Event.users``) or ``EventRecord`` from ``crud.read_event_one(lock=False)``.
     
     :return List[schema.Event]: A list of formatted Events.
     """
     result:List[schema.Event] = []
+    time_now = int(datetime.now(timezone.utc).timestamp())
+    
+    # resolve every participant once (the same User joins many Events)
+    members = security.resolve_members(guild, (db_user.discord_id for event in events_db for db_user in event.users))
+    users_simple:Dict[int, schema.UserSimple] = {}
+    
     for event in events_db:
         # event attributes
         event_type:Literal["ctftime", "custom"] = "ctftime" if event.event_id is not None else "custom"
         
         now_running:Optional[bool] = None
         if event_type == "ctftime" and event.start is not None and event.finish is not None:
-            time_now = int(datetime.now(timezone.utc).timestamp())
             if event.start <= time_now and event.finish >= time_now:
                 now_running = True
             else:
@@ -47,26 +53,19 @@ async def format_event(guild:discord.Guild, events_db:List[model.Event]) -> List
         # users
         users:List[schema.UserSimple] = []
         for db_user in event.users:
-            discord_user:Optional[schema.DiscordUser] = None
-            user_role:List[schema.UserRole] = []
-            member = guild.get_member(db_user.discord_id)
-            if member is not None:
-                discord_user = schema.DiscordUser(
-                    display_name=member.display_name,
-                    id=member.id,
-                    name=member.name
+            if (user_simple := users_simple.get(db_user.discord_id)) is None:
+                discord_user, user_role = members[db_user.discord_id]
+                user_simple = schema.UserSimple(
+                    discord_id=db_user.discord_id,
+                    user_role=user_role,
+                    status=db_user.status,
+                    skills=db_user.skills,
+                    rhythm_games=db_user.rhythm_games,
+                    discord=discord_user
                 )
-                
-                user_role = await security.get_role(member)
+                users_simple[db_user.discord_id] = user_simple
             
-            users.append(schema.UserSimple(
-                discord_id=db_user.discord_id,
-                user_role=user_role,
-                status=db_user.status,
-                skills=db_user.skills,
-                rhythm_games=db_user.rhythm_games,
-                discord=discord_user
-            ))
+            users.append(user_simple)
 
         result.append(schema.Event(
             id=event.id,
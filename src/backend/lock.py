@@ -0,0 +1,67 @@
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
+import asyncio
+import logging
+
+from src.config import settings
+from src.database import database
+from src import crud
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# utils
+async def _renew_loop(ids:List[int], lock_owner_token:str, duration:int):
+    # renew 3 times per lease, so one slow (or failed) renewal doesn't lose the lock
+    interval = max(duration / 3, 1)
+    while len(ids) != 0:
+        await asyncio.sleep(interval)
+        try:
+            # use another session, the holder's session may be in use
+            async with database.with_get_db() as session:
+                renewed = await crud.renew_event_lock(session, ids, lock_owner_token, duration)
+        except Exception as e:
+            logger.error(f"fail to renew the lock of Events (id={ids}): {str(e)}")
+            continue
+
+        if len(renewed) != len(ids):
+            lost = [id for id in ids if id not in renewed]
+            logger.warning(f"lost the lock of Events (id={lost}) (lease expired and taken by others, or unlocked)")
+            ids = renewed
+
+
+# functions
+@asynccontextmanager
+async def keep_event_lock(ids:Union[int, List[int]], lock_owner_token:str, duration:Optional[int]=None):
+    """
+    Keep Events locked while the holder is working (renew the lease in the background).
+
+    The lease itself can be short, so a crashed holder only blocks the Events for a few seconds.
+
+    ```
+    event_db, lock_owner_token = await crud.read_event_one(session, id, lock=True, duration=settings.EVENT_LOCK_DURATION_SECONDS)
+    try:
+        async with keep_event_lock(id, lock_owner_token):
+            ...
+    finally:
+        await crud.unlock_event(session, id, lock_owner_token)
+    ```
+
+    :param ids: An Event or Events which were locked with ``lock_owner_token``.
+    :param lock_owner_token:
+    :param duration: The lease of each renewal (in seconds), default ``EVENT_LOCK_DURATION_SECONDS``.
+    """
+    if isinstance(ids, int):
+        ids = [ids]
+    if duration is None:
+        duration = settings.EVENT_LOCK_DURATION_SECONDS
+
+    task = asyncio.create_task(_renew_loop(list(ids), lock_owner_token, duration))
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
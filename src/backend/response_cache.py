@@ -0,0 +1,148 @@
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import secrets
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.utils.cache import TTLCache
+from src.config import settings
+from src import crud
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# ETag = "<nonce>.<data version>.<query hash>.<valid until>"
+# - the nonce changes every time the process starts (data versions start from 0 again)
+# - "valid until" is when the response changes without any write (now_running), capped by RESPONSE_ETAG_MAX_AGE_SECONDS
+# so If-None-Match is answered before rendering (no ORM, no format_event)
+_nonce = secrets.token_hex(4)
+
+# rendered responses of the list endpoints
+# (path, query) -> (data version, ETag, body)
+response_cache = TTLCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+# ETag -> hash of the body
+# when the data version changed but the rendered body didn't, the client's old ETag still gets 304
+body_hashes = TTLCache(settings.RESPONSE_CACHE_SIZE * 4, settings.RESPONSE_ETAG_MAX_AGE_SECONDS)
+
+# utils
+def _query_hash(request:Request) -> str:
+    query = sorted(request.query_params.multi_items())
+    return hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+
+
+def _parse_if_none_match(request:Request) -> List[str]:
+    if (if_none_match := request.headers.get("if-none-match")) is None:
+        return []
+    return [tag.strip().removeprefix("W/") for tag in if_none_match.split(",") if tag.strip() != ""]
+
+
+def _etag_is_current(etag:str, version:int, query_hash:str, time_now:float) -> bool:
+    try:
+        nonce, etag_version, etag_query_hash, valid_until = etag.strip("\"").split(".")
+        return nonce == _nonce and \
+            int(etag_version) == version and \
+            etag_query_hash == query_hash and \
+            time_now < int(valid_until)
+    except ValueError:
+        return False
+
+
+def _not_modified(etag:Optional[str]) -> Response:
+    headers = {"Cache-Control": "no-cache"}
+    if etag is not None:
+        headers["ETag"] = etag
+    return Response(status_code=304, headers=headers)
+
+
+def next_status_change(events:Iterable[Any]) -> Optional[int]:
+    """
+    ``now_running`` of a response changes without any write, at the ``start`` (or ``finish + 1``) of an Event.
+
+    :param events: Events (anything with ``start`` and ``finish``) in the response.
+
+    :return Optional[int]: The timestamp of the next change, ``None`` if it never changes.
+    """
+    time_now = int(time.time())
+    result:Optional[int] = None
+    for event in events:
+        if event.start is None or event.finish is None:
+            continue
+        for t in (event.start, event.finish + 1):
+            if t > time_now and (result is None or t < result):
+                result = t
+    return result
+
+
+# functions
+async def conditional_response(
+    request:Request,
+    session:AsyncSession,
+    render:Callable[[], Awaitable[Tuple[Any, Optional[int]]]]
+) -> Response:
+    """
+    Serve a GET endpoint with ``ETag`` / ``If-None-Match`` and the rendered response cache.
+
+    - ``If-None-Match`` with an ETag of the current ``crud.data_version`` -> 304 without rendering
+    - a response rendered under the current ``crud.data_version`` -> served from the cache without rendering
+    - otherwise render it, and still answer 304 if the body didn't change
+
+    :param request:
+    :param session: The session used by ``render`` (responses rendered from a lagging read replica don't get an ETag).
+    :param render: Returns the response data and the timestamp when it changes without any write (see ``next_status_change()``).
+
+    :return Response: 200 with JSON body, or 304.
+
+    :raise HTTPException: From ``render``.
+    """
+    time_now = time.time()
+    version = crud.data_version.version
+    query_hash = _query_hash(request)
+    client_etags = _parse_if_none_match(request)
+
+    # conditional request
+    for etag in client_etags:
+        if etag == "*" or _etag_is_current(etag, version, query_hash, time_now):
+            # "*" isn't an entity-tag, answer without ETag
+            return _not_modified(f"\"{etag}\"" if etag != "*" else None)
+
+    # rendered response cache
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    cached = response_cache.get(key)
+    if cached is not None and cached[0] == version:
+        _, etag, body = cached
+        return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    # render
+    data, changes_at = await render()
+    body = JSONResponse(jsonable_encoder(data)).body
+
+    replica_lagging = session.info.get("replica", False) and \
+        (time.monotonic() - crud.data_version.bumped_at) < settings.DATABASE_READ_MAX_LAG_SECONDS
+    if replica_lagging:
+        # the replica may not have the writes of this data version yet
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+    valid_until = int(time_now + settings.RESPONSE_ETAG_MAX_AGE_SECONDS)
+    if changes_at is not None:
+        valid_until = min(valid_until, changes_at)
+    etag = f"\"{_nonce}.{version}.{query_hash}.{valid_until}\""
+    body_hash = hashlib.sha1(body).hexdigest()
+    body_hashes.set(etag.strip("\""), body_hash)
+
+    # cache (only if nothing was written while rendering)
+    ttl = min(settings.RESPONSE_CACHE_TTL_SECONDS, valid_until - time_now)
+    if ttl > 0 and crud.data_version.version == version:
+        response_cache.set(key, (version, etag, body), ttl)
+
+    # the data version changed, but the body didn't
+    for client_etag in client_etags:
+        if body_hashes.get(client_etag) == body_hash:
+            return _not_modified(etag)
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
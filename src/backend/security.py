@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple, Iterable
 import logging
 
 from sqlalchemy.exc import IntegrityError
@@ -6,33 +6,84 @@ from fastapi import HTTPException, Request
 from discord.ext import commands
 import discord
 
-from src.config import settings, settings_lock
+from src.config import settings, ConfigSnapshot, get_config
 from src.database.database import with_get_db
 from src.bot import get_guild
+from src.utils.cache import TTLCache
 from src import schema
 from src import crud
 
 # logging
 logger = logging.getLogger("uvicorn")
 
+# auth cache
+# discord_id -> (member, roles) of users who passed check_user_and_auto_register() (in the Guild, has roles, in database)
+# - invalidated by src.cog.auth_cache (member and role updates) and update_config_cache()
+# - only positive results are cached (a rejected user may get roles or register at any time)
+auth_cache = TTLCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_auth_cache(discord_id:Optional[int]=None):
+    """
+    :param discord_id: ``None`` to invalidate all users.
+    """
+    if discord_id is None:
+        auth_cache.clear()
+    else:
+        auth_cache.delete(discord_id)
+
+
 # utils
-async def get_role(member:discord.Member) -> List[schema.UserRole]:
+def _get_role(member:discord.Member, config:ConfigSnapshot) -> List[schema.UserRole]:
     roles = []
     if member.guild_permissions.administrator == True:
         roles.append(schema.UserRole.administrator)
     
-    async with settings_lock:
-        pm_role_id = settings.PM_ROLE_ID
-        member_role_id = settings.MEMBER_ROLE_ID
-    
-    if member.get_role(pm_role_id):
+    if member.get_role(config.PM_ROLE_ID):
         roles.append(schema.UserRole.pm)
     
-    if member.get_role(member_role_id):
+    if member.get_role(config.MEMBER_ROLE_ID):
         roles.append(schema.UserRole.member)
     
     return roles
+
+
+async def get_role(member:discord.Member) -> List[schema.UserRole]:
+    return _get_role(member, get_config())
+
+
+def resolve_members(
+    guild:discord.Guild,
+    discord_ids:Iterable[int]
+) -> Dict[int, Tuple[Optional[schema.DiscordUser], List[schema.UserRole]]]:
+    """
+    Resolve members and roles of many users at once (for formatting a whole page).
+    
+    :param guild:
+    :param discord_ids: Duplicated ids are resolved once.
     
+    :return Dict[int, Tuple[Optional[schema.DiscordUser], List[schema.UserRole]]]: ``{discord_id: (discord_user, user_role)}``, ``(None, [])`` if the user isn't in the guild.
+    """
+    config = get_config()
+    result = {}
+    for discord_id in discord_ids:
+        if discord_id in result:
+            continue
+        
+        if (member := guild.get_member(discord_id)) is None:
+            result[discord_id] = (None, [])
+            continue
+        
+        result[discord_id] = (
+            schema.DiscordUser(
+                display_name=member.display_name,
+                id=member.id,
+                name=member.name
+            ),
+            _get_role(member, config)
+        )
+    
+    return result
+
 
 # functions
 async def check_administrator(discord_id:int) -> Optional[discord.Member]:
@@ -83,11 +134,9 @@ async def check_user(discord_id:int, force_pm:bool) -> discord.Member:
         raise HTTPException(403)
     
     # check role
-    async with settings_lock:
-        member_role_id = settings.MEMBER_ROLE_ID
-        pm_role_id = settings.PM_ROLE_ID
-    member_role = member.get_role(member_role_id)
-    pm_role = member.get_role(pm_role_id)
+    config = get_config()
+    member_role = member.get_role(config.MEMBER_ROLE_ID)
+    pm_role = member.get_role(config.PM_ROLE_ID)
     if force_pm:
         if pm_role is None:
             raise HTTPException(403)
@@ -117,6 +166,17 @@ async def check_user_and_auto_register(
     
     :raise HTTPException:
     """
+    # warm path - no database access
+    if (cached := auth_cache.get(discord_id)) is not None:
+        member, roles = cached
+        if force_pm:
+            if schema.UserRole.pm not in roles:
+                raise HTTPException(403)
+        else:
+            if schema.UserRole.pm not in roles and schema.UserRole.member not in roles:
+                raise HTTPException(403)
+        return member
+    
     # check discord
     # if the user doesn't meet the requirements, raise exception
     member = await check_user(discord_id, force_pm)
@@ -140,6 +200,8 @@ async def check_user_and_auto_register(
         logger.error(f"fail to check user and auto register (discord_id={discord_id}): {str(e)}")
         raise HTTPException(500, f"fail to check user and auto register (discord_id={discord_id})")
     
+    auth_cache.set(discord_id, (member, _get_role(member, get_config())))
+    
     return member
 
 
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from typing import Optional, List
+from typing import Optional, List, Dict
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,7 +7,7 @@ from fastapi import HTTPException
 
 from src.database import model
 from src.backend import security
-from src.schema import UserRole, User, DiscordUser, EventSimple
+from src.schema import User, EventSimple
 from src.bot import get_guild
 from src.config import settings
 from src import crud
@@ -43,48 +43,44 @@ async def get_user(session:AsyncSession, discord_id:Optional[int]=None) -> List[
         raise HTTPException(500, f"fail to read Users from database")
 
     result = []
+    time_now = int(datetime.now(timezone.utc).timestamp())
+    
+    # resolve members once, format every Event once (the same Event is joined by many Users)
+    members = security.resolve_members(guild, (db_user.discord_id for db_user in db_users))
+    events_simple:Dict[int, EventSimple] = {}
+    
     for db_user in db_users:
-        member = guild.get_member(db_user.discord_id)
-        
         # events
         events = []
         for event in db_user.events:
-            event_type = "ctftime" if event.event_id is not None else "custom"
+            if (event_s := events_simple.get(event.id)) is None:
+                event_type = "ctftime" if event.event_id is not None else "custom"
 
-            now_running:Optional[bool] = None
-            if event_type == "ctftime":
-                time_now = int(datetime.now(timezone.utc).timestamp())
-                if event.start <= time_now and event.finish >= time_now:
-                    now_running = True
-                else:
-                    now_running = False
+                now_running:Optional[bool] = None
+                if event_type == "ctftime":
+                    if event.start <= time_now and event.finish >= time_now:
+                        now_running = True
+                    else:
+                        now_running = False
 
-            event_s = EventSimple(
-                id=event.id,
-                archived=event.archived,
-                event_id=event.event_id,
-                title=event.title,
-                start=event.start,
-                finish=event.finish,
-                channel_id=event.channel_id,
-                scheduled_event_id=event.scheduled_event_id,
-                now_running=now_running,
-                type=event_type
-            )
+                event_s = EventSimple(
+                    id=event.id,
+                    archived=event.archived,
+                    event_id=event.event_id,
+                    title=event.title,
+                    start=event.start,
+                    finish=event.finish,
+                    channel_id=event.channel_id,
+                    scheduled_event_id=event.scheduled_event_id,
+                    now_running=now_running,
+                    type=event_type
+                )
+                events_simple[event.id] = event_s
 
             events.append(event_s)
 
         # discord user
-        discord_user:Optional[DiscordUser] = None
-        user_role:List[UserRole] = []
-        if member is not None:
-            discord_user = DiscordUser(
-                display_name=member.display_name,
-                id=member.id,
-                name=member.name
-            )
-            
-            user_role = await security.get_role(member)
+        discord_user, user_role = members[db_user.discord_id]
 
         result.append(User(
             discord_id=db_user.discord_id,
@@ -1,4 +1,5 @@
 from .detect_events_new import _detect_events_new
 from .detect_event_update_and_remove import _detect_event_update_and_remove
 from .auto_archive import _auto_archive
-from .recover_scheduled_events import _recover_scheduled_events
\ No newline at end of file
+from .recover_scheduled_events import _recover_scheduled_events
+from .worker_pool import run_bounded, PoolResult
\ No newline at end of file
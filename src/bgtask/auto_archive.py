@@ -3,7 +3,9 @@ import logging
 
 from src.database import database
 from src.backend import channel_op
+from src.backend.lock import keep_event_lock
 from src.config import settings
+from src.bgtask.worker_pool import run_bounded
 from src import crud
 
 # logging
@@ -25,11 +27,42 @@ async def _auto_archive():
             return
         need_archive_id = [event.id for event in need_archive]
     
-    for event_db_id in need_archive_id:
+    if len(need_archive_id) == 0:
+        return
+    
+    # lock all Events with one statement
+    # the lease is renewed by keep_event_lock() until the whole batch is done
+    try:
+        async with database.with_get_db() as session:
+            locked_id, not_locked_id, lock_owner_token = await crud.lock_events_many(
+                session,
+                need_archive_id,
+                duration=settings.EVENT_LOCK_DURATION_SECONDS,
+                archived=False
+            )
+    except Exception as e:
+        logger.error(f"fail to lock CTF events which need to be archived: {str(e)}")
+        return
+    
+    for event_db_id in not_locked_id:
+        logger.warning(f"Event (id={event_db_id}) was locked (or archived). Skipped...")
+    
+    async def archive(event_db_id:int):
         logger.info(f"Detected: Event (id={event_db_id}) was expired.")
         try:
-            await channel_op.archive_event(event_db_id, f"Event (id={event_db_id}) was expired")
+            await channel_op.archive_event(event_db_id, f"Event (id={event_db_id}) was expired", lock_owner_token)
         except Exception as e:
             logger.error(f"fail to archive the expired Event (id={event_db_id}): {str(e)}")
     
-    return
\ No newline at end of file
+    try:
+        async with keep_event_lock(locked_id, lock_owner_token):
+            await run_bounded("auto_archive", locked_id, archive)
+    finally:
+        # unlock all Events with one statement
+        try:
+            async with database.with_get_db() as session:
+                await crud.unlock_events_many(session, locked_id, lock_owner_token)
+        except Exception as e:
+            logger.critical(f"fail to unlock Events (id={locked_id}): {str(e)}")
+    
+    return
@@ -8,12 +8,21 @@ from src.utils import embed_creator
 from src.utils import notification
 from src.config import settings
 from src.bot import get_guild
+from src.backend.lock import keep_event_lock
 from src.backend import channel_op
+from src.bgtask.worker_pool import run_bounded
 from src import crud
 
 # logging
 logger = logging.getLogger("uvicorn")
 
+# utils
+def _is_changed(event_db_returning:Dict[str, Any], event_api:Dict[str, Any]) -> bool:
+    return event_db_returning["title"] != event_api["title"] or \
+        event_db_returning["start"] != int(datetime.fromisoformat(event_api["start"]).astimezone(timezone.utc).timestamp()) or \
+        event_db_returning["finish"] != int(datetime.fromisoformat(event_api["finish"]).astimezone(timezone.utc).timestamp())
+
+
 # functions
 async def check_and_update_event(event_db_id:int, event_api:Dict[str, Any]):
     """
@@ -38,7 +47,7 @@ async def check_and_update_event(event_db_id:int, event_api:Dict[str, Any]):
         try:
             event_db, lock_owner_token = await crud.read_event_one(
                 session=session,
-                lock=True, duration=120,
+                lock=True, duration=settings.EVENT_LOCK_DURATION_SECONDS,
                 type="ctftime",
                 archived=False, # ensoure the event isn't archived
                 id=event_db_id
@@ -54,47 +63,49 @@ async def check_and_update_event(event_db_id:int, event_api:Dict[str, Any]):
             return
 
         try:
-            async with session.begin():
-                # check
-                if event_db.title != ntitle or \
-                        event_db.start != int(nstart.timestamp()) or \
-                        event_db.finish != int(nfinish.timestamp()):
-                    # update detected
-                    logger.info(f"Detected: {ntitle} (old: {event_db.title}, id={event_db.id}, event_id={event_db.event_id}) was updated")
-                    
-                    # update database
-                    event_db = await crud.update_event(
-                        session=session,
-                        id=event_db.id,
-                        lock_owner_token=lock_owner_token,
-                        title=ntitle,
-                        start=int(nstart.timestamp()),
-                        finish=int(nfinish.timestamp())
-                    )
-                    
-                    # returning
-                    event_db_returning["id"] = event_db.id
-                    event_db_returning["event_id"] = event_db.event_id
-                    event_db_returning["channel_id"] = event_db.channel_id
-                    event_db_returning["updated"] = True
-
-            if not event_db_returning["updated"]:
-                return
-            
-            # send notification to announcement channel
-            embed = await embed_creator.create_event_embed(event_api, "Update detected!")
-            try:
-                await notification.send_notification(channel_id="anno", embed=embed)
-            except Exception as e:
-                logger.error(f"fail to send notification to announcement channel: {str(e)}")
-                # ignore exception
-            
-            # send notification to private channel
-            try:
-                await notification.send_notification(channel_id=event_db_returning["channel_id"], embed=embed)
-            except Exception as e:
-                logger.error(f"fail to send notification to channel (id={event_db_returning["channel_id"]}): {str(e)}")
-                # ignore exception
+            # keep the lock until notifications are sent
+            async with keep_event_lock(event_db_id, lock_owner_token):
+                async with session.begin():
+                    # check
+                    if event_db.title != ntitle or \
+                            event_db.start != int(nstart.timestamp()) or \
+                            event_db.finish != int(nfinish.timestamp()):
+                        # update detected
+                        logger.info(f"Detected: {ntitle} (old: {event_db.title}, id={event_db.id}, event_id={event_db.event_id}) was updated")
+                        
+                        # update database
+                        event_db = await crud.update_event(
+                            session=session,
+                            id=event_db.id,
+                            lock_owner_token=lock_owner_token,
+                            title=ntitle,
+                            start=int(nstart.timestamp()),
+                            finish=int(nfinish.timestamp())
+                        )
+                        
+                        # returning
+                        event_db_returning["id"] = event_db.id
+                        event_db_returning["event_id"] = event_db.event_id
+                        event_db_returning["channel_id"] = event_db.channel_id
+                        event_db_returning["updated"] = True
+
+                if not event_db_returning["updated"]:
+                    return
+                
+                # send notification to announcement channel
+                embed = await embed_creator.create_event_embed(event_api, "Update detected!")
+                try:
+                    await notification.send_notification(channel_id="anno", embed=embed)
+                except Exception as e:
+                    logger.error(f"fail to send notification to announcement channel: {str(e)}")
+                    # ignore exception
+                
+                # send notification to private channel
+                try:
+                    await notification.send_notification(channel_id=event_db_returning["channel_id"], embed=embed)
+                except Exception as e:
+                    logger.error(f"fail to send notification to channel (id={event_db_returning["channel_id"]}): {str(e)}")
+                    # ignore exception
         except Exception as e:
             logger.error(f"fail to update an Event (id={event_db_id}): {str(e)}")
         finally:
@@ -149,33 +160,62 @@ async def _detect_event_update_and_remove():
                 limit=None,
                 finish_after=int((datetime.now(timezone.utc) + timedelta(days=settings.DATABASE_SEARCH_DAYS)).timestamp()),
                 finish_before=None,
-                before_id=None
+                before_id=None,
+                brief=True
             )
         
         events_db_returning = [
             {
                 "id": event.id,
                 "event_id": event.event_id,
-                "title": event.title
+                "title": event.title,
+                "start": event.start,
+                "finish": event.finish
             } for event in events_db
         ]
     except Exception as e:
         logger.error(f"fail to get known CTFTime Events from database: {str(e)}")
         return
-    
+
+    if len(events_db_returning) == 0:
+        return
+
+    # get the whole window from CTFTime API in a few requests
+    events_api_window:Dict[int, Dict[str, Any]] = {}
+    try:
+        events_api = await ctf_api.fetch_ctf_events_window(
+            min(e["start"] for e in events_db_returning),
+            max(e["finish"] for e in events_db_returning) + 1
+        )
+        events_api_window = {event_api["id"]: event_api for event_api in events_api}
+    except Exception as e:
+        logger.error(f"fail to get CTF events in window from CTFTime API (fall back to per-event lookups): {str(e)}")
+
     # check
-    for event_db_returning in events_db_returning:
-        try:
-            events_api = await ctf_api.fetch_ctf_events(event_db_returning["event_id"])
-        except Exception as e:
-            logger.error(f"fail to get CTF event (event_id={event_db_returning["event_id"]}) from CTFTime API: {str(e)}")
-            continue
-        
-        if len(events_api) == 1:
-            # check update
-            await check_and_update_event(event_db_returning["id"], events_api[0])
-        else:
-            # removed
-            await remove_event(event_db_returning)
-    
+    async def check(event_db_returning:Dict[str, Any]):
+        if (event_api := events_api_window.get(event_db_returning["event_id"])) is None:
+            # not in the window (removed, moved out of the window or too many events) -> per-event lookup
+            try:
+                events_api = await ctf_api.fetch_ctf_events(event_db_returning["event_id"])
+            except Exception as e:
+                logger.error(f"fail to get CTF event (event_id={event_db_returning["event_id"]}) from CTFTime API: {str(e)}")
+                return
+
+            if len(events_api) != 1:
+                # removed
+                await remove_event(event_db_returning)
+                return
+            event_api = events_api[0]
+
+        # check update (only lock the Event when something changed)
+        if _is_changed(event_db_returning, event_api):
+            await check_and_update_event(event_db_returning["id"], event_api)
+
+    await run_bounded(
+        "detect_event_update_and_remove",
+        events_db_returning,
+        check,
+        describe=lambda event_db_returning: f"id={event_db_returning["id"]}"
+    )
+
     return
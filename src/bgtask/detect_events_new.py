@@ -1,91 +1,109 @@
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
+from typing import Dict, Any, Set, Tuple
 import logging
 
 import discord
-from sqlalchemy.exc import IntegrityError
 
 from src.utils import ctf_api
 from src.utils import embed_creator
 from src.utils import notification
 from src.database import database
 from src import crud
-from src.config import settings
+from src.bgtask.worker_pool import run_bounded
 
 # logging
 logger = logging.getLogger("uvicorn")
 
 # function
+async def notify_new_event(event:Tuple[int, Dict[str, Any]]):
+    """
+    Send notification of a new CTFTime Event.
+    
+    :param event: ``(event_db_id, event_api)``
+    """
+    event_db_id, event_api = event
+    
+    embed = await embed_creator.create_event_embed(event_api, "New CTF event detected!")
+    view = discord.ui.View(timeout=None)
+    view.add_item(
+        discord.ui.Button(
+            label="Join",
+            style=discord.ButtonStyle.blurple,
+            custom_id=f"ctf_join_channel:{event_db_id}",
+            emoji="🚩"
+        )
+    )
+    try:
+        await notification.send_notification(channel_id="anno", embed=embed, view=view)
+    except Exception as e:
+        logger.error(f"fail to send notification to announcement channel: {str(e)}")
+        # ignore exception
+    
+    return
+
+
 async def _detect_events_new():
     """
     Detect new CTF Events on CTFTime
     """
-    # get events from CTFTime API
+    # get events from CTFTime API page by page (until now+CTFTIME_API_HORIZON_DAYS)
+    events_api_window:Dict[int, Dict[str, Any]] = {}
     try:
-        events_api = await ctf_api.fetch_ctf_events()
+        async for events_api in ctf_api.iter_ctf_events():
+            for event_api in events_api:
+                events_api_window[event_api["id"]] = event_api
     except Exception as e:
         logger.error(f"fail to get CTF events from CTFTime API: {str(e)}")
         return
-
-    # get events which are "ctftime" events and finish after now+DATABASE_SEARCH_DAYS (for example: now+(-90)) from database
-    # archived=None - get both archived and non-archived events to avoid missing any events
+    
+    if len(events_api_window) == 0:
+        return
+    
+    # keep the new ones
+    # compare with every known Event (archived or not), so archived Events which are still on CTFTime aren't inserted again
     try:
         async with database.with_get_db() as session:
-            events_db = await crud.read_event_many(
-                session,
-                type="ctftime",
-                archived=None,
-                limit=None,
-                finish_after=int((datetime.now(timezone.utc)+timedelta(days=settings.DATABASE_SEARCH_DAYS)).timestamp()),
-                finish_before=None,
-                before_id=None
-            )
-            events_db_event_id = [event.event_id for event in events_db]
+            events_db_event_id:Set[int] = await crud.read_known_event_ids(session, list(events_api_window.keys()))
     except Exception as e:
         logger.error(f"fail to get known CTF Events from database: {str(e)}")
         return
     
-    # check
-    for event_api in events_api:
-        event_id = event_api["id"]
-        event_db_id = None
-        if event_id not in events_db_event_id:
-            # new CTFTime Event detected
-            logger.info(f"new CTFTime Event detected: {event_api["title"]} (event_id={event_id})")
-            
-            # create a new Event in database
-            try:
-                async with database.with_get_db() as session:
-                    async with session.begin():
-                        event_db = await crud.create_event(
-                            session=session,
-                            event_id=event_id,
-                            title=event_api["title"],
-                            start=int(datetime.fromisoformat(event_api["start"]).astimezone(timezone.utc).timestamp()),
-                            finish=int(datetime.fromisoformat(event_api["finish"]).astimezone(timezone.utc).timestamp())
-                        )
-                        event_db_id = event_db.id
-            except IntegrityError:
-                logger.info(f"fail to create an Event in database: IntegrityError, skipped...")
-                continue
-            except Exception as e:
-                logger.error(f"fail to create an Event in database: {str(e)}")
-                continue
-            
-            # send notification
-            embed = await embed_creator.create_event_embed(event_api, "New CTF event detected!")
-            view = discord.ui.View(timeout=None)
-            view.add_item(
-                discord.ui.Button(
-                    label="Join",
-                    style=discord.ButtonStyle.blurple,
-                    custom_id=f"ctf_join_channel:{event_db_id}",
-                    emoji="🚩"
+    events_api_new:Dict[int, Dict[str, Any]] = {
+        event_id: event_api for event_id, event_api in events_api_window.items() if event_id not in events_db_event_id
+    }
+    
+    if len(events_api_new) == 0:
+        return
+    
+    # create new Events in database (one statement, skip Events which were created by others)
+    try:
+        async with database.with_get_db() as session:
+            async with session.begin():
+                events_db_new = await crud.create_ctftime_events_many(
+                    session=session,
+                    events=[
+                        {
+                            "event_id": event_api["id"],
+                            "title": event_api["title"],
+                            "start": int(datetime.fromisoformat(event_api["start"]).astimezone(timezone.utc).timestamp()),
+                            "finish": int(datetime.fromisoformat(event_api["finish"]).astimezone(timezone.utc).timestamp())
+                        } for event_api in events_api_new.values()
+                    ]
                 )
-            )
-            try:
-                await notification.send_notification(channel_id="anno", embed=embed, view=view)
-            except Exception as e:
-                logger.error(f"fail to send notification to announcement channel: {str(e)}")
-                # ignore exception
+                created = [(event_db.id, events_api_new[event_db.event_id]) for event_db in events_db_new]
+    except Exception as e:
+        logger.error(f"fail to create Events in database: {str(e)}")
+        return
+    
+    for event_db_id, event_api in created:
+        logger.info(f"new CTFTime Event detected: {event_api["title"]} (id={event_db_id}, event_id={event_api["id"]})")
+    
+    # send notifications
+    await run_bounded(
+        "detect_events_new",
+        created,
+        notify_new_event,
+        describe=lambda event: f"id={event[0]}"
+    )
     
     return
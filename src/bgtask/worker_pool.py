@@ -0,0 +1,67 @@
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+import asyncio
+import logging
+
+from src.config import settings
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# result
+@dataclass
+class PoolResult:
+    results:List[Tuple[Any, Any]] = field(default_factory=list)             # (item, return value)
+    errors:List[Tuple[Any, BaseException]] = field(default_factory=list)    # (item, exception)
+    timeouts:List[Any] = field(default_factory=list)                        # item
+
+
+# functions
+async def run_bounded(
+    name:str,
+    items:Iterable[Any],
+    func:Callable[[Any], Awaitable[Any]],
+    concurrency:Optional[int]=None,
+    timeout:Optional[float]=None,
+    describe:Optional[Callable[[Any], str]]=None,
+) -> PoolResult:
+    """
+    Run ``func(item)`` for every item with at most ``concurrency`` items in flight.
+
+    Exceptions and timeouts don't stop other items, they are logged and collected in the result.
+
+    :param name: Used in log messages.
+    :param items:
+    :param func:
+    :param concurrency: Default ``BGTASK_CONCURRENCY``.
+    :param timeout: Timeout of each item (in seconds), default ``BGTASK_ITEM_TIMEOUT_SECONDS``.
+    :param describe: How to show an item in log messages, default ``str(item)``.
+
+    :return PoolResult:
+    """
+    if concurrency is None:
+        concurrency = settings.BGTASK_CONCURRENCY
+    if timeout is None:
+        timeout = settings.BGTASK_ITEM_TIMEOUT_SECONDS
+    if describe is None:
+        describe = str
+
+    items = list(items)
+    result = PoolResult()
+    iterator = iter(items)
+
+    async def worker():
+        # workers share the iterator, so every item is taken exactly once
+        for item in iterator:
+            try:
+                result.results.append((item, await asyncio.wait_for(func(item), timeout)))
+            except asyncio.TimeoutError:
+                logger.error(f"[{name}] timed out after {timeout}s (item={describe(item)})")
+                result.timeouts.append(item)
+            except Exception as e:
+                logger.error(f"[{name}] failed (item={describe(item)}): {str(e)}")
+                result.errors.append((item, e))
+
+    await asyncio.gather(*[worker() for _ in range(min(max(concurrency, 1), len(items)))])
+
+    return result
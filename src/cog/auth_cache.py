@@ -0,0 +1,87 @@
+import logging
+
+from discord.ext import commands
+import discord
+
+from src.backend import security
+from src.config import settings
+from src import crud
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# cog
+class AuthCache(commands.Cog):
+    """
+    Invalidate the auth cache in ``src.backend.security`` when members or roles change.
+    
+    Members, roles and channels are also a part of the API responses, so ``crud.data_version`` is bumped as well.
+    """
+    def __init__(self, bot:commands.Bot):
+        self.bot:commands.Bot = bot
+    
+    
+    @commands.Cog.listener()
+    async def on_member_update(self, before:discord.Member, after:discord.Member):
+        if after.guild.id != settings.GUILD_ID:
+            return
+        security.invalidate_auth_cache(after.id)
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member:discord.Member):
+        # a registered User came back (API responses resolve it again)
+        if member.guild.id != settings.GUILD_ID:
+            return
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member:discord.Member):
+        if member.guild.id != settings.GUILD_ID:
+            return
+        security.invalidate_auth_cache(member.id)
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_user_update(self, before:discord.User, after:discord.User):
+        # username / avatar (not a member update)
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before:discord.abc.GuildChannel, after:discord.abc.GuildChannel):
+        # Event channels (name, jump_url) are a part of the API responses
+        if after.guild.id != settings.GUILD_ID:
+            return
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel:discord.abc.GuildChannel):
+        if channel.guild.id != settings.GUILD_ID:
+            return
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before:discord.Role, after:discord.Role):
+        # for example: the administrator permission of a role was changed
+        if after.guild.id != settings.GUILD_ID:
+            return
+        security.invalidate_auth_cache()
+        crud.data_version.bump()
+    
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role:discord.Role):
+        if role.guild.id != settings.GUILD_ID:
+            return
+        security.invalidate_auth_cache()
+        crud.data_version.bump()
+
+
+def setup(bot:commands.Bot):
+    bot.add_cog(AuthCache(bot))
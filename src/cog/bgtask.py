@@ -6,6 +6,8 @@ import discord
 from src.backend import security
 from src.backend import channel_op
 from src.config import settings
+from src.database import database
+from src.utils import ctf_api
 from src import bgtask
 
 # logging
@@ -26,11 +28,19 @@ class CTFBGTask(commands.Cog):
     # background task
     @tasks.loop(minutes=settings.CHECK_INTERVAL_MINUTES)
     async def task_checks(self):
-        # process
-        await bgtask._detect_events_new()
-        await bgtask._detect_event_update_and_remove()
-        await bgtask._auto_archive()
-        await bgtask._recover_scheduled_events()
+        # process (with the bgtask database pool, so API requests aren't starved)
+        with database.bgtask_pool():
+            if ctf_api.circuit_breaker.is_open():
+                # don't burn a timeout for every event when CTFTime is down
+                logger.warning("CTFTime API is unavailable (circuit open), skip detecting new, updated and removed events")
+            else:
+                await bgtask._detect_events_new()
+                await bgtask._detect_event_update_and_remove()
+            await bgtask._auto_archive()
+            await bgtask._recover_scheduled_events()
+        
+        # persist CTFTime cache
+        await ctf_api.flush_disk_cache()
     
     
     @task_checks.before_loop
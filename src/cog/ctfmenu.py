@@ -99,7 +99,7 @@ class EventMenu(discord.ui.View):
 
     async def build_embed_and_view(self) -> discord.Embed:
         try:
-            async with database.with_get_db() as session:
+            async with database.with_get_read_db() as session:
                 if self.type == "ctftime":
                     if self.ctftime_cache_ready is False:
                         self.ctftime_events_cache = await crud.read_event_many(
@@ -110,6 +110,7 @@ class EventMenu(discord.ui.View):
                             finish_after=int((datetime.now(timezone.utc) + timedelta(days=settings.DATABASE_SEARCH_DAYS)).timestamp()),
                             finish_before=None,
                             before_id=None,
+                            users=False,
                         )
                         self.ctftime_cache_ready = True
 
@@ -133,6 +134,7 @@ class EventMenu(discord.ui.View):
                             finish_after=None,
                             finish_before=None,
                             before_id=before_id,
+                            users=False,
                         )
                         self.custom_has_next = len(events) > self.per_page
                         self.events = events[:self.per_page]
@@ -163,7 +165,7 @@ class EventMenu(discord.ui.View):
             lines = []
             for idx, e in enumerate(current, start=display_start + 1):
                 channel_created = "[⭐️ Channel created]" if e.channel_id is not None else ""
-                users_count = len(e.users)
+                users_count = e.participant_count
                 
                 if self.type == "ctftime":
                     time_now = int(datetime.now(timezone.utc).timestamp())
@@ -304,7 +306,7 @@ class EventDetailMenu(discord.ui.View):
         return member
 
 
-    async def _read_event(self) -> Optional[model.Event]:
+    async def _read_event(self) -> Optional[crud.EventRecord]:
         try:
             async with database.with_get_db() as session:
                 event_db, _ = await crud.read_event_one(
@@ -380,19 +382,22 @@ class EventDetailMenu(discord.ui.View):
         if (member := (await self._check_permission(interaction, False))) is None:
             return
         
+        # defer (joining may wait for the Event lock)
+        await interaction.response.defer()
+        
         # create or join channel
         try:
             await channel_op.create_and_join_channel(member, self.event_db_id)
         except HTTPException as e:
-            await interaction.response.send_message(str(e), ephemeral=True)
+            await interaction.followup.send(str(e), ephemeral=True)
             return
         except Exception as e:
             logger.error(f"fail to join Event (id={self.event_db_id}): {str(e)}")
-            await interaction.response.send_message("fail to join Event", ephemeral=True)
+            await interaction.followup.send("fail to join Event", ephemeral=True)
             return
 
         embed = await self.build_embed_and_view()
-        await interaction.response.edit_message(embed=embed, view=self)
+        await interaction.edit_original_response(embed=embed, view=self)
 
 
     @discord.ui.button(style=discord.ButtonStyle.red, label="Archive Event", row=0)
@@ -1,4 +1,5 @@
-import asyncio
+from typing import Optional
+from dataclasses import dataclass
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,12 +8,7 @@ class Settings(BaseSettings):
     # Discord bot configuration
     DISCORD_BOT_TOKEN:str
     GUILD_ID:int
-    # from database
-    ANNOUNCEMENT_CHANNEL_ID:int=-1
-    CTF_CHANNEL_CATEGORY_ID:int=-1
-    ARCHIVE_CATEGORY_ID:int=-1
-    PM_ROLE_ID:int=-1
-    MEMBER_ROLE_ID:int=-1
+    # from database -> ConfigSnapshot (get_config())
     
     # HTTP API configuration
     HTTP_SECRET_KEY:str
@@ -21,6 +17,11 @@ class Settings(BaseSettings):
     HTTP_COOKIE_DOMAIN:str              # for example .example.com
     HTTP_COOKIE_SECURE:bool
     HTTP_COOKIE_MAX_AGE:int=60*60*24*30 # in seconds, default 30 days
+    AUTH_CACHE_SIZE:int=1024            # authorized users (src.backend.security), 0 to disable
+    AUTH_CACHE_TTL_SECONDS:float=60     # invalidated by member/role updates and config changes, the TTL is a safety net
+    RESPONSE_CACHE_SIZE:int=256         # rendered GET /event/ctftime, /event/custom and /user/ (src.backend.response_cache), 0 to disable
+    RESPONSE_CACHE_TTL_SECONDS:float=10 # invalidated by crud writes, the TTL covers other processes and missed Discord events
+    RESPONSE_ETAG_MAX_AGE_SECONDS:int=300   # an ETag is answered with 304 without rendering for at most this long (missed Discord events)
     
     # Discord OAuth2 configuration
     DISCORD_OAUTH2_CLIENT_ID:str
@@ -32,9 +33,47 @@ class Settings(BaseSettings):
     CTFTIME_API_EVENT:str=""
     CTFTIME_API_TEAM:str=""
     DATABASE_SEARCH_DAYS:int=-90        # search events which finish after now_days+DATABASE_SEARCH_DAYS (for example: now_days+(-90)) in database
+    CTFTIME_API_PAGE_LIMIT:int=100      # events per request when listing /events/
+    CTFTIME_API_MAX_PAGES:int=10        # max requests per listing (avoid looping forever)
+    CTFTIME_API_HORIZON_DAYS:int=90     # detect new events which start before now_days+CTFTIME_API_HORIZON_DAYS
+    CTFTIME_TEAM_CACHE_SIZE:int=1024
+    CTFTIME_TEAM_CACHE_TTL_SECONDS:int=60*60*24
+    CTFTIME_TEAM_CACHE_NEGATIVE_TTL_SECONDS:int=60*10
+    CTFTIME_API_START_GRANULARITY_SECONDS:int=60*60
+    CTFTIME_RESPONSE_CACHE_SIZE:int=1024
+    CTFTIME_RESPONSE_CACHE_TTL_SECONDS:int=60*5         # for responses without ETag / Last-Modified
+    CTFTIME_RESPONSE_CACHE_MAX_AGE_SECONDS:int=60*60*24 # for responses with ETag / Last-Modified (revalidated every time)
+    CTFTIME_CACHE_PATH:Optional[str]=None                # persist the CTFTime cache (SQLite) across restarts, for example ./cache/ctftime.sqlite3
+    CTFTIME_API_RATE_LIMIT:int=5        # at most CTFTIME_API_RATE_LIMIT requests per CTFTIME_API_RATE_PERIOD seconds
+    CTFTIME_API_RATE_PERIOD:float=1.0
+    CTFTIME_API_MAX_RETRIES:int=2       # retry on 5xx, 429 and timeouts
+    CTFTIME_API_BACKOFF_BASE_SECONDS:float=1.0
+    CTFTIME_API_BACKOFF_MAX_SECONDS:float=10.0
+    CTFTIME_API_CIRCUIT_THRESHOLD:int=5 # consecutive failures before skipping CTFTime requests
+    CTFTIME_API_CIRCUIT_COOLDOWN_SECONDS:int=60*5
+    
+    # Background task configuration
+    BGTASK_CONCURRENCY:int=4            # events processed at the same time (keep it small, Discord has rate limits)
+    BGTASK_ITEM_TIMEOUT_SECONDS:int=180
     
     # Database configuration
     DATABASE_URL:str
+    DATABASE_POOL_SIZE:int=5                    # API, Discord interactions
+    DATABASE_MAX_OVERFLOW:int=10
+    DATABASE_POOL_TIMEOUT_SECONDS:float=30
+    DATABASE_POOL_RECYCLE_SECONDS:int=1800
+    DATABASE_POOL_PRE_PING:bool=True
+    DATABASE_BGTASK_POOL_SIZE:int=2             # a separate small pool, so the bgtask loop can't starve API requests
+    DATABASE_BGTASK_MAX_OVERFLOW:int=2
+    DATABASE_READ_URL:Optional[str]=None        # (optional) read replica for read-only API paths
+    DATABASE_READ_MAX_LAG_SECONDS:float=10      # fall back to the primary when the replica is further behind
+    DATABASE_READ_CHECK_INTERVAL_SECONDS:float=5
+    EVENT_LOCK_DURATION_SECONDS:int=15          # renewed in the background while the holder is working (see src.backend.lock)
+    EVENT_LOCK_WAIT_SECONDS:float=5.0           # how long users wait for a locked Event (for example: join storms)
+    EVENT_LOCK_POLL_INTERVAL_SECONDS:float=0.5
+    EVENT_LOCK_LOCAL:bool=True                  # reject contenders in this process before they touch the database
+    EVENT_CACHE_SIZE:int=1024                   # read_event_one(lock=False) cache, 0 to disable
+    EVENT_CACHE_TTL_SECONDS:float=30            # safety net for writes from other processes
     
     # Metadata
     COMMIT_ID:str="unknown"
@@ -46,11 +85,24 @@ settings = Settings()
 settings.CTFTIME_API_EVENT = settings.CTFTIME_API + "/events/"
 settings.CTFTIME_API_TEAM = settings.CTFTIME_API + "/teams/"
 
-# lock
-# for the following members
-# - ANNOUNCEMENT_CHANNEL_ID
-# - CTF_CHANNEL_CATEGORY_ID
-# - ARCHIVE_CATEGORY_ID
-# - PM_ROLE_ID
-# - MEMBER_ROLE_ID
-settings_lock = asyncio.Lock()
+# config (from database)
+# an immutable snapshot, update_config_cache() swaps the whole object
+# readers take a reference with get_config() (no lock) and read all values from the same snapshot
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    ANNOUNCEMENT_CHANNEL_ID:int=-1
+    CTF_CHANNEL_CATEGORY_ID:int=-1
+    ARCHIVE_CATEGORY_ID:int=-1
+    PM_ROLE_ID:int=-1
+    MEMBER_ROLE_ID:int=-1
+
+
+_config_snapshot = ConfigSnapshot()
+
+def get_config() -> ConfigSnapshot:
+    return _config_snapshot
+
+
+def set_config(snapshot:ConfigSnapshot):
+    global _config_snapshot
+    _config_snapshot = snapshot
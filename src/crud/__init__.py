@@ -1,8 +1,12 @@
 from .config import create_or_update_config, read_config
 from .user import create_user, read_user, update_user
 from .event import (
-    unlock_event,
+    unlock_event, lock_events_many, unlock_events_many, renew_event_lock,
     NotFoundError, LockedError,
     join_event, delete_user_in_event,
-    create_event, read_event_one, read_event_many, read_ctfime_events_need_archive, update_event,
-)
\ No newline at end of file
+    create_event, create_ctftime_events_many, read_event_one, read_event_many, read_ctfime_events_need_archive, read_known_event_ids, update_event,
+)
+from .lock import unlock_notifier, local_event_locks
+from .statement_cache import statement_cache_info
+from .event_cache import event_cache, EventRecord, EventUserRecord
+from .data_version import data_version
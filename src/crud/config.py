@@ -6,6 +6,7 @@ import sqlalchemy
 
 from src.config import settings
 from src.database.model import Config
+from src.crud.data_version import data_version
 
 # create and update
 async def create_or_update_config(
@@ -53,16 +54,17 @@ async def create_or_update_config(
         .on_conflict_do_update(
             index_elements=["id"],
             set_=args
-        )
+        ) \
+        .execution_options(populate_existing=True)  # RETURNING overwrites the Config in the identity map (no refresh)
     
     # execute
     try:
-        result = (await session.execute(stmt)).scalar_one()
-        await session.flush()
-        await session.refresh(result)
-        return result
+        return (await session.execute(stmt)).scalar_one()
     except Exception:
         raise
+    finally:
+        # PM_ROLE_ID / MEMBER_ROLE_ID change user_role in API responses
+        data_version.bump(session)
 
 
 # read
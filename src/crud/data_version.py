@@ -0,0 +1,59 @@
+from typing import Optional
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import sqlalchemy
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# data version
+_PENDING_KEY = "data_version_bump"
+
+class DataVersion:
+    """
+    A monotonic stamp of the data served by the list endpoints (Events, Users and participants).
+
+    - crud write functions call ``bump()`` synchronously, and again after the transaction is committed
+      (a reader may render the old data between the write and the commit)
+    - Discord member / role changes (``src.cog.auth_cache``) also bump it, they are a part of the responses
+    - in-process only, writes from other processes are covered by the TTL of the caches keyed by it
+    """
+    def __init__(self):
+        self._version = 0
+        self.bumped_at = 0.0    # time.monotonic()
+
+
+    @property
+    def version(self) -> int:
+        """
+        Take it before reading from database, and only cache the result if it's unchanged after reading.
+        """
+        return self._version
+
+
+    def bump(self, session:Optional[AsyncSession]=None):
+        """
+        :param session: Bump again after ``session`` is committed.
+        """
+        self._version += 1
+        self.bumped_at = time.monotonic()
+
+        if session is not None:
+            session.sync_session.info[_PENDING_KEY] = True
+
+
+data_version = DataVersion()
+
+# bump again after commit
+@sqlalchemy.event.listens_for(Session, "after_commit")
+def _after_commit(session:Session):
+    if session.info.pop(_PENDING_KEY, False):
+        data_version.bump()
+
+
+@sqlalchemy.event.listens_for(Session, "after_rollback")
+def _after_rollback(session:Session):
+    session.info.pop(_PENDING_KEY, None)
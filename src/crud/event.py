@@ -1,15 +1,238 @@
-from typing import List, Optional, Literal, Tuple, Union
+from typing import List, Dict, Any, Optional, Literal, Tuple, Union, Set
 from datetime import datetime, timedelta, timezone
+import asyncio
 import hashlib
 import os
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 import sqlalchemy
 
 from src.database.model import Event, User, user_event
+from src.crud.lock import UNLOCK_CHANNEL, unlock_notifier, local_event_locks
+from src.crud.statement_cache import cached_statement
+from src.crud.event_cache import event_cache, EventRecord
+from src.crud.data_version import data_version
 from src.config import settings
 
+# columns for bulk scans (read_event_many(brief=True), read_ctfime_events_need_archive)
+EVENT_BRIEF_COLUMNS = (Event.id, Event.event_id, Event.title, Event.start, Event.finish)
+
+# cached statements (see src.crud.statement_cache)
+# bind parameters don't use column names (they are reserved in INSERT/UPDATE)
+def _event_one_filter(
+    stmt:Union[sqlalchemy.Select, sqlalchemy.Update],
+    type:Optional[Literal["ctftime", "custom"]],
+    archived:Optional[bool]
+) -> Union[sqlalchemy.Select, sqlalchemy.Update]:
+    stmt = stmt.where(Event.id == sqlalchemy.bindparam("target_id"))
+    
+    if type is not None:
+        if type == "ctftime":
+            stmt = stmt.where(Event.event_id != None)
+        elif type == "custom":
+            stmt = stmt.where(Event.event_id == None)
+        else:
+            raise ValueError("type should be \"ctftime\", \"custom\" or None")
+    
+    if archived is not None:
+        stmt = stmt.where(Event.archived == archived)
+    
+    return stmt
+
+
+def _event_one_match(event:Event, type:Optional[Literal["ctftime", "custom"]], archived:Optional[bool]) -> bool:
+    # _event_one_filter() for cached Events
+    if type is not None:
+        if type == "ctftime":
+            if event.event_id is None:
+                return False
+        elif type == "custom":
+            if event.event_id is not None:
+                return False
+        else:
+            raise ValueError("type should be \"ctftime\", \"custom\" or None")
+    
+    if archived is not None and event.archived != archived:
+        return False
+    
+    return True
+
+
+def _check_lock_exists() -> sqlalchemy.Exists:
+    # bind parameters: target_id, owner_token, time_now
+    return sqlalchemy.exists(
+        sqlalchemy.select(Event.id) \
+        .where(Event.id == sqlalchemy.bindparam("target_id")) \
+        .where(Event.locked_by == sqlalchemy.bindparam("owner_token")) \
+        .where(Event.locked_until >= sqlalchemy.bindparam("time_now"))
+    )
+
+
+@cached_statement
+def _read_event_one_stmt(type:Optional[Literal["ctftime", "custom"]], archived:Optional[bool]) -> sqlalchemy.Select:
+    # bind parameters: target_id
+    return _event_one_filter(sqlalchemy.select(Event), type, archived) \
+        .options(selectinload(Event.users))
+
+
+@cached_statement
+def _lock_event_one_stmt(type:Optional[Literal["ctftime", "custom"]], archived:Optional[bool]) -> sqlalchemy.Select:
+    # bind parameters: target_id, time_now, lock_until, owner_token
+    check_exists_cte = _event_one_filter(sqlalchemy.select(Event), type, archived).cte("check_exists_cte")
+    
+    try_lock_cte = (
+        _event_one_filter(sqlalchemy.update(Event), type, archived)
+        .where(sqlalchemy.or_(
+            Event.locked_until == None,
+            Event.locked_until < sqlalchemy.bindparam("time_now")
+        ))
+        .values(
+            locked_until = sqlalchemy.bindparam("lock_until"),
+            locked_by = sqlalchemy.bindparam("owner_token")
+        )
+        .returning(Event)
+    ).cte("try_lock_cte")
+    
+    check_lock = sqlalchemy.exists(
+        sqlalchemy.select(try_lock_cte.c.id) \
+        .where(try_lock_cte.c.id == sqlalchemy.bindparam("target_id")) \
+        .where(try_lock_cte.c.locked_by == sqlalchemy.bindparam("owner_token"))
+    )
+    
+    return sqlalchemy.select(
+        sqlalchemy.case(
+            (check_lock, "success"),
+            else_="locked"
+        ),
+        Event
+    ) \
+    .options(selectinload(Event.users)) \
+    .join(check_exists_cte, check_exists_cte.c.id == Event.id) \
+    .where(check_exists_cte.c.id == sqlalchemy.bindparam("target_id"))
+
+
+@cached_statement
+def _read_event_many_stmt(
+    type:Literal["ctftime", "custom"],
+    archived:Optional[bool],
+    brief:bool,
+    users:bool,
+    mode:Literal["finish_after", "first_page", "next_page"]
+) -> sqlalchemy.Select:
+    # bind parameters: finish_after (finish_after mode), row_limit, finish_before and before_id (next_page mode)
+    if brief:
+        stmt = sqlalchemy.select(*EVENT_BRIEF_COLUMNS)
+    elif users:
+        stmt = sqlalchemy.select(Event) \
+            .options(selectinload(Event.users))
+    else:
+        stmt = sqlalchemy.select(Event)
+    
+    if type == "ctftime":
+        stmt = stmt.where(Event.event_id != None) \
+            .order_by(sqlalchemy.desc(Event.finish), sqlalchemy.desc(Event.id))
+        
+        if mode == "finish_after":
+            stmt = stmt.where(Event.finish >= sqlalchemy.bindparam("finish_after"))
+        else:
+            stmt = stmt.limit(sqlalchemy.bindparam("row_limit"))
+            if mode == "next_page":
+                stmt = stmt.where(sqlalchemy.or_(
+                    Event.finish < sqlalchemy.bindparam("finish_before"),
+                    sqlalchemy.and_(
+                        Event.finish == sqlalchemy.bindparam("finish_before"),
+                        Event.id < sqlalchemy.bindparam("before_id")
+                    )
+                ))
+    else:
+        stmt = stmt.where(Event.event_id == None) \
+            .order_by(sqlalchemy.desc(Event.id)) \
+            .limit(sqlalchemy.bindparam("row_limit"))
+        
+        if mode == "next_page":
+            stmt = stmt.where(Event.id < sqlalchemy.bindparam("before_id"))
+    
+    if archived is not None:
+        stmt = stmt.where(Event.archived == archived)
+    
+    return stmt
+
+
+@cached_statement
+def _join_event_stmt() -> sqlalchemy.Update:
+    # bind parameters: target_id, target_discord_id, owner_token, time_now
+    join_event_cte = sqlalchemy.insert(user_event).from_select(
+        ["user_discord_id", "event_db_id"],
+        sqlalchemy.select(
+            sqlalchemy.bindparam("target_discord_id", type_=sqlalchemy.BigInteger),
+            sqlalchemy.bindparam("target_id", type_=sqlalchemy.BigInteger)
+        ) \
+            .where(_check_lock_exists())
+    ).returning(user_event.c.user_discord_id).cte("join_event_cte")
+    
+    # participant_count is updated only when the User was inserted
+    return sqlalchemy.update(Event) \
+        .where(Event.id == sqlalchemy.bindparam("target_id")) \
+        .where(sqlalchemy.exists(sqlalchemy.select(join_event_cte.c.user_discord_id))) \
+        .values(participant_count=Event.participant_count + 1) \
+        .returning(Event.participant_count) \
+        .execution_options(synchronize_session=False)
+
+
+@cached_statement
+def _delete_user_in_event_stmt(by_discord_id:bool) -> sqlalchemy.Select:
+    # bind parameters: target_id, owner_token, time_now, target_discord_id (by_discord_id)
+    check_lock_exists_stmt = _check_lock_exists()
+    
+    delete_user_in_event_stmt = sqlalchemy.delete(user_event) \
+        .where(user_event.c.event_db_id == sqlalchemy.bindparam("target_id")) \
+        .where(check_lock_exists_stmt) \
+        .returning(user_event)
+    
+    if by_discord_id:
+        delete_user_in_event_stmt = delete_user_in_event_stmt \
+            .where(user_event.c.user_discord_id == sqlalchemy.bindparam("target_discord_id"))
+    
+    delete_user_in_event_cte = delete_user_in_event_stmt.cte("delete_user_in_event_cte")
+    
+    # participant_count
+    deleted_count = sqlalchemy.select(sqlalchemy.func.count()) \
+        .select_from(delete_user_in_event_cte) \
+        .scalar_subquery()
+    update_participant_count_cte = sqlalchemy.update(Event) \
+        .where(Event.id == sqlalchemy.bindparam("target_id")) \
+        .where(sqlalchemy.exists(sqlalchemy.select(delete_user_in_event_cte.c.user_discord_id))) \
+        .values(participant_count=Event.participant_count - deleted_count) \
+        .returning(Event.id) \
+        .cte("update_participant_count_cte")
+    
+    return sqlalchemy.select(
+        sqlalchemy.case(
+            (check_lock_exists_stmt, "normal"),
+            else_="error"
+        ),
+        sqlalchemy.func.array_agg(delete_user_in_event_cte.c.user_discord_id)
+    ).add_cte(update_participant_count_cte)   # not referenced, PostgreSQL still runs it
+
+@cached_statement
+def _read_events_need_archive_stmt() -> sqlalchemy.Select:
+    # bind parameters: finish_before
+    # uses ix_events_unarchived_finish (see scripts/explain_event_indexes.py)
+    return sqlalchemy.select(*EVENT_BRIEF_COLUMNS) \
+        .where(Event.archived == False) \
+        .where(Event.finish < sqlalchemy.bindparam("finish_before"))
+
+
+@cached_statement
+def _read_known_event_ids_stmt() -> sqlalchemy.Select:
+    # bind parameters: target_event_ids (expanding)
+    # uses the unique index on event_id (archived or not)
+    return sqlalchemy.select(Event.event_id) \
+        .where(Event.event_id.in_(sqlalchemy.bindparam("target_event_ids", expanding=True)))
+
+
 # lock and unlock
 class NotFoundError(Exception):
     pass
@@ -161,6 +384,18 @@ class LockedError(Exception):
 #                raise LockedError
 #
 
+def _with_unlock_notify(session:AsyncSession, stmt:sqlalchemy.Update) -> Union[sqlalchemy.Update, sqlalchemy.Select]:
+    # PostgreSQL: send NOTIFY (delivered on commit) with the unlocked ids in the same statement
+    if session.get_bind().dialect.name != "postgresql":
+        return stmt
+    
+    unlock_cte = stmt.cte("unlock_cte")
+    return sqlalchemy.select(
+        unlock_cte.c.id,
+        sqlalchemy.func.pg_notify(UNLOCK_CHANNEL, sqlalchemy.cast(unlock_cte.c.id, sqlalchemy.String))
+    )
+
+
 async def unlock_event(session:AsyncSession, id:int, lock_owner_token:str) -> bool:
     """
     Unlock an Event.
@@ -185,13 +420,158 @@ async def unlock_event(session:AsyncSession, id:int, lock_owner_token:str) -> bo
     
     # execute
     unlocked = False
-    async with session.begin():
-        if (await session.execute(stmt)).scalar_one_or_none() is not None:
-            unlocked = True
+    try:
+        async with session.begin():
+            if (await session.execute(_with_unlock_notify(session, stmt))).scalars().one_or_none() is not None:
+                unlocked = True
+    finally:
+        local_event_locks.release(id, lock_owner_token)
+    
+    # wake up waiters in this process
+    if unlocked:
+        unlock_notifier.notify(id)
     
     return unlocked
 
 
+async def lock_events_many(
+    session:AsyncSession,
+    ids:List[int],
+    duration:int,
+    archived:Optional[bool]=None,
+) -> Tuple[List[int], List[int], str]:
+    """
+    Lock all free Events in ``ids`` with one statement (they share one lock owner token).
+    
+    Inside this function, it uses ``async with session.begin()``.
+    
+    :param session:
+    :param ids:
+    :param duration: How long you want to lock the Events (in seconds).
+    :param archived: Only lock archived, non-archived Events, or ``None`` to lock both types of Events.
+    
+    :return List[int]: Events which were locked.
+    :return List[int]: Events which were not locked (locked by others, not found or filtered by ``archived``).
+    :return str: Lock owner token.
+    
+    :raise (Exception from sqlalchemy):
+    """
+    # prepare arguments
+    time_now = datetime.now(timezone.utc)
+    locked_until = time_now + timedelta(seconds=duration)
+    lock_owner_token = hashlib.sha256(os.urandom(32)).hexdigest()
+    
+    if len(ids) == 0:
+        return [], [], lock_owner_token
+    
+    # local tier
+    local_ids = [id for id in ids if local_event_locks.try_acquire(id, lock_owner_token)]
+    if len(local_ids) == 0:
+        return [], list(ids), lock_owner_token
+    
+    # stmt
+    stmt = sqlalchemy.update(Event) \
+        .where(Event.id.in_(local_ids)) \
+        .where(sqlalchemy.or_(
+            Event.locked_until == None,
+            Event.locked_until < int(time_now.timestamp())
+        )) \
+        .values(
+            locked_until=int(locked_until.timestamp()),
+            locked_by=lock_owner_token
+        ) \
+        .returning(Event.id)
+    
+    if archived is not None:
+        stmt = stmt.where(Event.archived == archived)
+    
+    # execute
+    locked = set()
+    try:
+        async with session.begin():
+            locked = set((await session.execute(stmt)).scalars().all())
+    finally:
+        for id in local_ids:
+            local_event_locks.record_db(id in locked)
+            if id not in locked:
+                local_event_locks.release(id, lock_owner_token)
+    
+    return [id for id in ids if id in locked], [id for id in ids if id not in locked], lock_owner_token
+
+
+async def unlock_events_many(session:AsyncSession, ids:List[int], lock_owner_token:str) -> List[int]:
+    """
+    Unlock Events which were locked by ``lock_events_many()`` with one statement.
+    
+    :param session:
+    :param ids:
+    :param lock_owner_token:
+    
+    :return List[int]: Events which were unlocked.
+    
+    :raise (Exception from sqlalchemy):
+    """
+    if len(ids) == 0:
+        return []
+    
+    # stmt
+    stmt = sqlalchemy.update(Event) \
+        .where(Event.id.in_(ids)) \
+        .where(Event.locked_by == lock_owner_token) \
+        .values(
+            locked_until=None,
+            locked_by=None
+        ) \
+        .returning(Event.id)
+    
+    # execute
+    try:
+        async with session.begin():
+            unlocked = list((await session.execute(_with_unlock_notify(session, stmt))).scalars().all())
+    finally:
+        for id in ids:
+            local_event_locks.release(id, lock_owner_token)
+    
+    # wake up waiters in this process
+    for id in unlocked:
+        unlock_notifier.notify(id)
+    
+    return unlocked
+
+
+async def renew_event_lock(session:AsyncSession, ids:List[int], lock_owner_token:str, duration:int) -> List[int]:
+    """
+    Extend the lease of Events which are still locked by ``lock_owner_token`` with one statement.
+    
+    Inside this function, it uses ``async with session.begin()``.
+    
+    :param session:
+    :param ids:
+    :param lock_owner_token:
+    :param duration: The new lease, counted from now (in seconds).
+    
+    :return List[int]: Events which were renewed (Events which are not in the list were lost).
+    
+    :raise (Exception from sqlalchemy):
+    """
+    if len(ids) == 0:
+        return []
+    
+    # prepare arguments
+    locked_until = datetime.now(timezone.utc) + timedelta(seconds=duration)
+    
+    # stmt
+    stmt = sqlalchemy.update(Event) \
+        .where(Event.id.in_(ids)) \
+        .where(Event.locked_by == lock_owner_token) \
+        .values(locked_until=int(locked_until.timestamp())) \
+        .returning(Event.id)
+    
+    # execute
+    async with session.begin():
+        return list((await session.execute(stmt)).scalars().all())
+
+
 # User - Event
 async def join_event(
     session:AsyncSession,
@@ -202,7 +582,7 @@ async def join_event(
     """
     *This function "flushes" changes. Caller has to commit changes manually.*
     
-    Join an User to an Event.
+    Join an User to an Event (and update ``Event.participant_count`` in the same statement).
     
     :param session:
     :param event_db_id:
@@ -213,35 +593,33 @@ async def join_event(
     """
     time_now = datetime.now(timezone.utc)
     
-    # check lock
-    check_lock_stmt = sqlalchemy.select(Event.id) \
-        .where(Event.id == event_db_id) \
-        .where(Event.locked_by == lock_owner_token) \
-        .where(Event.locked_until >= int(time_now.timestamp()))
-    
-    check_lock_exists_stmt = sqlalchemy.exists(check_lock_stmt)
-                
-    # insert
-    stmt = sqlalchemy.insert(user_event).from_select(
-        ["user_discord_id", "event_db_id"],
-        sqlalchemy.select(discord_id, event_db_id) \
-            .where(check_lock_exists_stmt)
-    ).returning(user_event)
+    # stmt
+    stmt = _join_event_stmt()
+    params = {
+        "target_id": event_db_id,
+        "target_discord_id": discord_id,
+        "owner_token": lock_owner_token,
+        "time_now": int(time_now.timestamp()),
+    }
     
     # execute
     try:
-        (await session.execute(stmt)).one()
+        (await session.execute(stmt, params)).one()
         await session.flush()
-        return
     except Exception:
         raise
+    finally:
+        event_cache.invalidate(session, event_db_id)
+        data_version.bump(session)
+    
+    return
 
 
 async def delete_user_in_event(session:AsyncSession, id:int, lock_owner_token:str, discord_id:Optional[int]=None):
     """
     *This function "flushes" changes. Caller has to commit changes manually.*
     
-    Remove an User (or Users) from an Event.
+    Remove an User (or Users) from an Event (and update ``Event.participant_count`` in the same statement).
     
     :param session:
     :param event_db_id:
@@ -252,45 +630,31 @@ async def delete_user_in_event(session:AsyncSession, id:int, lock_owner_token:st
     """
     time_now = datetime.now(timezone.utc)
     
-    # check lock
-    check_lock_stmt = sqlalchemy.select(Event.id) \
-        .where(Event.id == id) \
-        .where(Event.locked_by == lock_owner_token) \
-        .where(Event.locked_until >= int(time_now.timestamp()))
-    
-    check_lock_exists_stmt = sqlalchemy.exists(check_lock_stmt)
-
-    # delete
-    delete_user_in_event_stmt = sqlalchemy.delete(user_event) \
-        .where(user_event.c.event_db_id == id) \
-        .where(check_lock_exists_stmt) \
-        .returning(user_event)
-    
-    if discord_id is not None:
-        delete_user_in_event_stmt = delete_user_in_event_stmt.where(user_event.c.user_discord_id == discord_id)
-    
-    delete_user_in_event_cte = delete_user_in_event_stmt.cte("delete_user_in_event_cte")
-
     # stmt
-    stmt = sqlalchemy.select(
-        sqlalchemy.case(
-            (check_lock_exists_stmt, "normal"),
-            else_="error"
-        ),
-        sqlalchemy.func.array_agg(delete_user_in_event_cte.c.user_discord_id)
-    )
+    stmt = _delete_user_in_event_stmt(discord_id is not None)
+    params = {
+        "target_id": id,
+        "owner_token": lock_owner_token,
+        "time_now": int(time_now.timestamp()),
+    }
+    if discord_id is not None:
+        params["target_discord_id"] = discord_id
     
     # execute
     try:
-        result = (await session.execute(stmt)).one()
+        result = (await session.execute(stmt, params)).one()
         
         if result[0] != "normal":
             raise RuntimeError("Invalid lock")
         
         await session.flush()
-        return
     except Exception:
         raise
+    finally:
+        event_cache.invalidate(session, id)
+        data_version.bump(session)
+    
+    return
 
 
 # create
@@ -349,12 +713,61 @@ async def create_event(
     
     # execute
     try:
-        result = (await session.execute(stmt)).scalar_one()
+        return (await session.execute(stmt)).scalar_one()
+    except Exception:
+        raise
+    finally:
+        data_version.bump(session)
+
+
+async def create_ctftime_events_many(
+    session:AsyncSession,
+    events:List[Dict[str, Any]],
+) -> List[Event]:
+    """
+    *This function "flushes" changes. Caller has to commit changes manually.*
+    
+    Create CTFTime Events in database with one statement, skipping Events which are already in database (by ``event_id``).
+    
+    :param session:
+    :param events: A list of ``{"event_id": ..., "title": ..., "start": ..., "finish": ...}``.
+    
+    :return List[Event]: The Events that were created (relationship wasn't loaded).
+    
+    :raise ValueError: Invalid arguments.
+    :raise (Exception from sqlalchemy):
+    """
+    # args
+    args = []
+    for event in events:
+        if event.get("event_id") is None or event.get("start") is None or event.get("finish") is None:
+            raise ValueError("event_id, start and finish are necessary for a CTFTime Event")
+        args.append({
+            "event_id": event["event_id"],
+            "title": event["title"],
+            "start": event["start"],
+            "finish": event["finish"],
+        })
+    
+    if len(args) == 0:
+        return []
+    
+    # stmt
+    # INSERT ... ON CONFLICT (event_id) DO NOTHING RETURNING ...
+    stmt = postgresql_insert(Event) \
+        .values(args) \
+        .on_conflict_do_nothing(index_elements=["event_id"]) \
+        .returning(Event)
+    
+    # execute
+    try:
+        result = (await session.execute(stmt)).scalars().all()
         await session.flush()
-        await session.refresh(result)
         return result
     except Exception:
         raise
+    finally:
+        data_version.bump(session)
 
 
 # read
@@ -365,118 +778,115 @@ async def read_event_one(
     duration:Optional[int]=None,
     type:Optional[Literal["ctftime", "custom"]]=None,
     archived:Optional[bool]=None,
-) -> Tuple[Event, Optional[str]]:
+    wait:Optional[float]=None,
+) -> Tuple[Union[Event, EventRecord], Optional[str]]:
     """
     Read one Event and try to lock an Event (if you want).
     
     Inside this function, it uses ``async with session.begin()``.
     
+    ``lock=False`` returns an ``EventRecord`` (a read-only snapshot, maybe from ``src.crud.event_cache``) instead of an ORM object.
+    
     :param session:
     :param id:
     :param lock: Whether to lock the Event.
     :param duration: How long you want to lock the Event (in seconds).
     :param type: Search ``ctftime``, ``custom`` Events, or ``None`` to search both types of Events.
     :param archived: Search archived, non-archived Events, or ``None`` to search both types of Events.
+    :param wait: How long to wait for a locked Event to be unlocked (in seconds), ``None`` to raise ``LockedError`` immediately.
     
-    :return Event:
+    :return Union[Event, EventRecord]: ``Event`` (``lock=True``) or ``EventRecord`` (``lock=False``).
     :return Optional[str]: Lock owner token.
     
     :raise NotFoundError: Can't find the Event.
-    :raise LockedError: The Event was locked.
+    :raise LockedError: The Event was locked (after waiting ``wait`` seconds).
     :raise ValueError:
     :raise RuntimeError:
     :raise (Exception from sqlalchemy):
     """
-    # functions
-    def _build_filter(stmt:Union[sqlalchemy.Select, sqlalchemy.Update]) -> Union[sqlalchemy.Select, sqlalchemy.Update]:
-        stmt = stmt.where(Event.id == id)
-        
-        if type is not None:
-            if type == "ctftime":
-                stmt = stmt.where(Event.event_id != None)
-            elif type == "custom":
-                stmt = stmt.where(Event.event_id == None)
-            else:
-                raise ValueError(f"type should be \"ctftime\", \"custom\" or None")
-        
-        if archived is not None:
-            stmt = stmt.where(Event.archived == archived)
-        
-        return stmt
-
-    # check exists stmt
-    check_exists:sqlalchemy.Select = _build_filter(sqlalchemy.select(Event))
+    # wait for the lock (woken up by unlock_event(), see src.crud.lock)
+    if lock and wait is not None and wait > 0:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while True:
+            try:
+                return (await read_event_one(session, id, lock, duration, type, archived))
+            except LockedError:
+                if (remaining := deadline - loop.time()) <= 0:
+                    raise
+                await unlock_notifier.wait(id, remaining)
     
     # no need to lock -> execute and return
     if lock == False:
-        check_exists = check_exists.options(selectinload(Event.users))
-        async with session.begin():
-            try:
-                event_db = (await session.execute(check_exists)).scalar_one_or_none()
-            except Exception:
-                raise
-            if event_db is None:
+        # cache (see src.crud.event_cache)
+        if (record := event_cache.get(id)) is not None:
+            if not _event_one_match(record, type, archived):
                 raise NotFoundError
-            return event_db, None
+            return record, None
+        
+        # read the Event without type / archived filters, so the record can be cached for every caller
+        record = None
+        version = event_cache.begin_fill(id)
+        try:
+            async with session.begin():
+                try:
+                    event_db = (await session.execute(_read_event_one_stmt(None, None), {"target_id": id})).scalar_one_or_none()
+                except Exception:
+                    raise
+                if event_db is None:
+                    raise NotFoundError
+                record = EventRecord.from_orm(event_db)
+        finally:
+            # don't cache rows from a read replica (they may be behind)
+            event_cache.end_fill(id, version, None if session.info.get("replica", False) else record)
+        
+        if not _event_one_match(record, type, archived):
+            raise NotFoundError
+        return record, None
     
     # need to lock
     # argument check
     if duration is None:
         raise ValueError("duration should not be None when lock is True")
     
+    # stmt
+    stmt = _lock_event_one_stmt(type, archived)
+    
     # prepare arguments
     time_now = datetime.now(timezone.utc)
     locked_until = time_now + timedelta(seconds=duration)
     lock_owner_token = hashlib.sha256(os.urandom(32)).hexdigest()
+    params = {
+        "target_id": id,
+        "time_now": int(time_now.timestamp()),
+        "lock_until": int(locked_until.timestamp()),
+        "owner_token": lock_owner_token,
+    }
     
-    # stmt
-    check_exists_cte = check_exists.cte("check_exists_cte")
+    # local tier (no database round trip for contenders in this process)
+    if not local_event_locks.try_acquire(id, lock_owner_token):
+        raise LockedError
     
-    try_lock:sqlalchemy.Update = _build_filter(sqlalchemy.update(Event))
-    try_lock_cte = (
-        try_lock
-        .where(sqlalchemy.or_(
-            Event.locked_until == None,
-            Event.locked_until < int(time_now.timestamp())
-        ))
-        .values(
-            locked_until = int(locked_until.timestamp()),
-            locked_by = lock_owner_token
-        )
-        .returning(Event)
-    ).cte("try_lock_cte")
-    
-    check_lock = sqlalchemy.exists(
-        sqlalchemy.select(try_lock_cte.c.id) \
-        .where(try_lock_cte.c.id == id) \
-        .where(try_lock_cte.c.locked_by == lock_owner_token)
-    )
-    
-    stmt = sqlalchemy.select(
-        sqlalchemy.case(
-            (check_lock, "success"),
-            else_="locked"
-        ),
-        Event
-    ) \
-    .options(selectinload(Event.users)) \
-    .join(check_exists_cte, check_exists_cte.c.id == Event.id) \
-    .where(check_exists_cte.c.id == id)
-
     # execute
-    async with session.begin():
-        results = (await session.execute(stmt)).all()
-        if len(results) == 0:
-            raise NotFoundError
-        else:
-            status = results[0][0]
-            event_db = results[0][1]
-            if status == "success":
-                return event_db, lock_owner_token
-            elif status == "locked":
-                raise LockedError
+    try:
+        async with session.begin():
+            results = (await session.execute(stmt, params)).all()
+            if len(results) == 0:
+                raise NotFoundError
             else:
-                raise RuntimeError("unexpected lock status")
+                status = results[0][0]
+                event_db = results[0][1]
+                if status == "success":
+                    local_event_locks.record_db(True)
+                    return event_db, lock_owner_token
+                elif status == "locked":
+                    local_event_locks.record_db(False)
+                    raise LockedError
+                else:
+                    raise RuntimeError("unexpected lock status")
+    except BaseException:
+        local_event_locks.release(id, lock_owner_token)
+        raise
 
 
 async def read_event_many(
@@ -489,7 +899,9 @@ async def read_event_many(
     finish_before:Optional[int]=None,
     # ctftime events (finish_before mode) and custom events
     before_id:Optional[int]=None,
-) -> List[Event]:
+    brief:bool=False,
+    users:bool=True,
+) -> Union[List[Event], List[sqlalchemy.Row]]:
     """
     Read Events.
     
@@ -515,27 +927,23 @@ async def read_event_many(
     :param finish_after:
     :param finish_before:
     :param before_id:
+    :param brief: Only read ``EVENT_BRIEF_COLUMNS`` (no ORM objects, no ``Event.users``), for bulk scans.
+    :param users: Whether to load ``Event.users``, list views which only need ``Event.participant_count`` should pass ``False``.
     
     :return List[Event]: A list of Events.
+    :return List[sqlalchemy.Row]: A list of rows (with attributes in ``EVENT_BRIEF_COLUMNS``) when ``brief=True``.
     
     :raise ValueError:
     :raise (Exception from sqlalchemy):
     """
-    # stmt
-    stmt = sqlalchemy.select(Event) \
-        .options(selectinload(Event.users))
-    
     # arguments
     if type == "ctftime":
-        stmt = stmt.where(Event.event_id != None) \
-            .order_by(sqlalchemy.desc(Event.finish), sqlalchemy.desc(Event.id))
-        
         if finish_after is not None:
             # finish_after mode
             if (finish_before is not None) or (limit is not None) or (before_id is not None):
                 raise ValueError("finish_before, limit and before_id are not available for CTFTime Events in finish_after mode")
             
-            stmt = stmt.where(Event.finish >= finish_after)
+            mode = "finish_after"
         else:
             # finish_before mode
             
@@ -543,23 +951,14 @@ async def read_event_many(
             if (limit is None) or (limit <= 0):
                 raise ValueError("limit is required and must be greater than 0 for CTFTime Events in finish_before mode")
             
-            stmt = stmt.limit(limit)
-            
             # finish_before & before_id
             if (finish_before is not None) and (before_id is not None):
-                stmt = stmt.where(sqlalchemy.or_(
-                    Event.finish < finish_before,
-                    sqlalchemy.and_(
-                        Event.finish == finish_before,
-                        Event.id < before_id
-                    )
-                ))
+                mode = "next_page"
+            elif (finish_before is None) and (before_id is None):
+                # first page
+                mode = "first_page"
             else:
-                if (finish_before is None) and (before_id is None):
-                    # first page
-                    pass
-                else:
-                    raise ValueError("invalid finish_before and before_id for CTFTime Events in finish_before mode")
+                raise ValueError("invalid finish_before and before_id for CTFTime Events in finish_before mode")
     elif type == "custom":
         if (finish_after is not None) or (finish_before is not None):
             raise ValueError("finish_after and finish_before are not available for custom Events")
@@ -567,26 +966,31 @@ async def read_event_many(
         if (limit is None) or (limit <= 0):
             raise ValueError("limit is required and must be greater than 0 for custom Events")
         
-        stmt = stmt.where(Event.event_id == None) \
-            .order_by(sqlalchemy.desc(Event.id)) \
-            .limit(limit)
-        
-        if before_id is not None:
-            stmt = stmt.where(Event.id < before_id)
+        mode = "next_page" if before_id is not None else "first_page"
     else:
         raise ValueError("invalid type")
     
-    if archived is not None:
-        stmt = stmt.where(Event.archived == archived)
+    # stmt
+    stmt = _read_event_many_stmt(type, archived, brief, users, mode)
+    params = {
+        k: v for k, v in {
+            "finish_after": finish_after,
+            "finish_before": finish_before,
+            "before_id": before_id,
+            "row_limit": limit,
+        }.items() if v is not None
+    }
 
     # execute
     try:
-        return (await session.execute(stmt)).scalars().all()
+        if brief:
+            return (await session.execute(stmt, params)).all()
+        return (await session.execute(stmt, params)).scalars().all()
     except Exception:
         raise
 
 
-async def read_ctfime_events_need_archive(session:AsyncSession, finish_before:int) -> List[Event]:
+async def read_ctfime_events_need_archive(session:AsyncSession, finish_before:int) -> List[sqlalchemy.Row]:
     """
     Read Events which need to be archived.
     
@@ -595,18 +999,42 @@ async def read_ctfime_events_need_archive(session:AsyncSession, finish_before:in
     :param session:
     :param finish_before: Search Events which are non-archived and finish before ``finish_before``
     
-    :return List[Event]: A list of Events.
+    :return List[sqlalchemy.Row]: A list of rows (with attributes in ``EVENT_BRIEF_COLUMNS``).
     
     :raise (Exception from sqlalchemy):
     """
     # stmt
-    stmt = sqlalchemy.select(Event) \
-        .options(selectinload(Event.users)) \
-        .where(Event.archived == False) \
-        .where(Event.finish < finish_before)
+    stmt = _read_events_need_archive_stmt()
+    params = {"finish_before": finish_before}
     
     try:
-        return (await session.execute(stmt)).scalars().all()
+        return (await session.execute(stmt, params)).all()
+    except Exception:
+        raise
+
+
+async def read_known_event_ids(session:AsyncSession, event_ids:List[int]) -> Set[int]:
+    """
+    Find which CTFTime Events are already in database (archived or not).
+    
+    **No need to lock. This function is just for bulk reading Events.**
+    
+    :param session:
+    :param event_ids: CTFTime Event ids.
+    
+    :return Set[int]: CTFTime Event ids in ``event_ids`` which are in database.
+    
+    :raise (Exception from sqlalchemy):
+    """
+    if len(event_ids) == 0:
+        return set()
+    
+    # stmt
+    stmt = _read_known_event_ids_stmt()
+    params = {"target_event_ids": event_ids}
+    
+    try:
+        return set((await session.execute(stmt, params)).scalars().all())
     except Exception:
         raise
 
@@ -668,13 +1096,14 @@ async def update_event(
         .where(Event.locked_by == lock_owner_token) \
         .where(Event.locked_until >= int(time_now.timestamp())) \
         .values(args) \
-        .returning(Event)
+        .returning(Event) \
+        .execution_options(populate_existing=True)  # RETURNING overwrites the Event in the identity map (no refresh)
     
     # execute
     try:
-        result = (await session.execute(stmt)).scalar_one()
-        await session.flush()
-        await session.refresh(result)
-        return result
+        return (await session.execute(stmt)).scalar_one()
     except Exception:
         raise
+    finally:
+        event_cache.invalidate(session, id)
+        data_version.bump(session)
@@ -0,0 +1,179 @@
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import sqlalchemy
+
+from src.database.model import Event, Status, Skills, RhythmGames
+from src.utils.cache import TTLCache
+from src.config import settings
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# records
+# read-only snapshots of an Event and it's Users, not bound to any session (safe to share between requests)
+# attributes have the same names as the ORM models, so readers can use either of them
+@dataclass(frozen=True)
+class EventUserRecord:
+    discord_id:int
+    status:Status
+    skills:Tuple[Skills, ...]
+    rhythm_games:Tuple[RhythmGames, ...]
+
+
+@dataclass(frozen=True)
+class EventRecord:
+    id:int
+    archived:bool
+    event_id:Optional[int]
+    title:str
+    start:Optional[int]
+    finish:Optional[int]
+    channel_id:Optional[int]
+    scheduled_event_id:Optional[int]
+    participant_count:int
+    users:Tuple[EventUserRecord, ...]
+
+    @classmethod
+    def from_orm(cls, event:Event) -> "EventRecord":
+        """
+        :param event: An Event with ``Event.users`` loaded.
+        """
+        return cls(
+            id=event.id,
+            archived=event.archived,
+            event_id=event.event_id,
+            title=event.title,
+            start=event.start,
+            finish=event.finish,
+            channel_id=event.channel_id,
+            scheduled_event_id=event.scheduled_event_id,
+            participant_count=event.participant_count,
+            users=tuple(
+                EventUserRecord(
+                    discord_id=user.discord_id,
+                    status=user.status,
+                    skills=tuple(user.skills),
+                    rhythm_games=tuple(user.rhythm_games)
+                ) for user in event.users
+            )
+        )
+
+
+# event read cache
+_PENDING_KEY = "event_cache_invalidate"
+
+class EventReadCache:
+    """
+    ``EventRecord`` keyed by ``Event.id``, for ``read_event_one(lock=False)``.
+
+    - crud write functions call ``invalidate()`` (an Event) or ``invalidate_user()`` (the Events an User joined) synchronously,
+      and again after the transaction is committed (a reader may refill the cache between the write and the commit)
+    - a fill which raced with an invalidation of the same Event is dropped (``begin_fill()`` / ``end_fill()``),
+      writes to other Events don't affect it
+    - ``EVENT_CACHE_TTL_SECONDS`` is the safety net for writes from other processes
+    """
+    def __init__(self):
+        self._cache = TTLCache(settings.EVENT_CACHE_SIZE, settings.EVENT_CACHE_TTL_SECONDS)
+        self._fills:Dict[int, List[int]] = {}    # Event id -> [version, readers], only while it's being read
+        self.dropped_fills = 0
+
+
+    def get(self, id:int) -> Optional[EventRecord]:
+        return self._cache.get(id)
+
+
+    def begin_fill(self, id:int) -> int:
+        """
+        Call it before reading the Event from database, and always call ``end_fill()`` after that.
+
+        :return int: The version to pass to ``end_fill()``.
+        """
+        fill = self._fills.setdefault(id, [0, 0])
+        fill[1] += 1
+        return fill[0]
+
+
+    def end_fill(self, id:int, version:int, record:Optional[EventRecord]):
+        """
+        :param id:
+        :param version: From ``begin_fill()``.
+        :param record: ``None`` when the read failed (nothing to cache).
+        """
+        fill = self._fills[id]
+        fill[1] -= 1
+        if fill[1] == 0:
+            del self._fills[id]
+
+        if record is None:
+            return
+        if fill[0] != version:
+            # the Event was invalidated while it was being read
+            self.dropped_fills += 1
+            return
+        self._cache.set(id, record)
+
+
+    def invalidate(self, session:Optional[AsyncSession]=None, id:Optional[int]=None):
+        """
+        :param session: Invalidate again after ``session`` is committed.
+        :param id: ``None`` to invalidate all Events.
+        """
+        if id is None:
+            self._cache.clear()
+            for fill in self._fills.values():
+                fill[0] += 1
+        else:
+            self._cache.delete(id)
+            if (fill := self._fills.get(id)) is not None:
+                fill[0] += 1
+
+        if session is not None:
+            session.sync_session.info.setdefault(_PENDING_KEY, set()).add(("event", id))
+
+
+    def invalidate_user(self, session:Optional[AsyncSession]=None, discord_id:Optional[int]=None):
+        """
+        Invalidate the Events which contain the User (cached Events embed their Users).
+
+        :param session: Invalidate again after ``session`` is committed.
+        :param discord_id:
+        """
+        for id, _, record in self._cache.dump():
+            if any(user.discord_id == discord_id for user in record.users):
+                self._cache.delete(id)
+
+        # Events which are being read may contain the User (unknown until they are read)
+        for fill in self._fills.values():
+            fill[0] += 1
+
+        if session is not None:
+            session.sync_session.info.setdefault(_PENDING_KEY, set()).add(("user", discord_id))
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._cache.stats(),
+            "ttl": self._cache.ttl,
+            "dropped_fills": self.dropped_fills,
+        }
+
+
+event_cache = EventReadCache()
+
+# invalidate again after commit
+@sqlalchemy.event.listens_for(Session, "after_commit")
+def _after_commit(session:Session):
+    for kind, key in session.info.pop(_PENDING_KEY, ()):
+        if kind == "user":
+            event_cache.invalidate_user(discord_id=key)
+        else:
+            event_cache.invalidate(id=key)
+
+
+@sqlalchemy.event.listens_for(Session, "after_rollback")
+def _after_rollback(session:Session):
+    session.info.pop(_PENDING_KEY, None)
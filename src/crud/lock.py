@@ -0,0 +1,153 @@
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection
+
+from src.config import settings
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# unlock notification
+UNLOCK_CHANNEL = "ctfeed_event_unlocked"
+
+class UnlockNotifier:
+    """
+    Wake up coroutines which are waiting for an Event to be unlocked.
+
+    - PostgreSQL (asyncpg): ``LISTEN`` on ``UNLOCK_CHANNEL``, ``unlock_event()`` sends ``NOTIFY`` with the Event id
+    - Other backends (or the listener is down): waiters poll every ``EVENT_LOCK_POLL_INTERVAL_SECONDS``
+
+    Unlocks in this process always wake up waiters directly.
+    """
+    def __init__(self):
+        self._conn:Optional[AsyncConnection] = None
+        self._waiters:Dict[int, asyncio.Event] = {}
+
+
+    @property
+    def listening(self) -> bool:
+        return self._conn is not None and not self._conn.closed
+
+
+    async def start(self, engine:AsyncEngine):
+        """
+        :raise (Exception from sqlalchemy or asyncpg):
+        """
+        if engine.dialect.name != "postgresql" or engine.dialect.driver != "asyncpg":
+            logger.info(f"LISTEN/NOTIFY isn't available on {engine.dialect.name}+{engine.dialect.driver}, waiting for Event locks by polling")
+            return
+
+        conn = await engine.connect()
+        try:
+            raw_conn = await conn.get_raw_connection()
+            await raw_conn.driver_connection.add_listener(UNLOCK_CHANNEL, self._on_notify)
+        except Exception:
+            await conn.close()
+            raise
+        self._conn = conn
+
+
+    async def stop(self):
+        if self._conn is None:
+            return
+
+        conn, self._conn = self._conn, None
+        try:
+            raw_conn = await conn.get_raw_connection()
+            await raw_conn.driver_connection.remove_listener(UNLOCK_CHANNEL, self._on_notify)
+        finally:
+            await conn.close()
+
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self.notify(int(payload))
+        except ValueError:
+            pass
+
+
+    def notify(self, id:int):
+        if (waiter := self._waiters.pop(id, None)) is not None:
+            waiter.set()
+
+
+    async def wait(self, id:int, timeout:float):
+        """
+        Wait until the Event is unlocked (or ``timeout``).
+
+        Expired leases don't send notifications, so even with ``LISTEN`` this wakes up every few poll intervals.
+        """
+        if self.listening:
+            timeout = min(timeout, settings.EVENT_LOCK_POLL_INTERVAL_SECONDS * 4)
+        else:
+            timeout = min(timeout, settings.EVENT_LOCK_POLL_INTERVAL_SECONDS)
+
+        waiter = self._waiters.setdefault(id, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+# local lock tier
+class LocalEventLocks:
+    """
+    In-process tier in front of the database lease (``locked_until`` / ``locked_by``).
+
+    Contenders in this process (for example: the bgtask loop and button handlers) are rejected here without a database round trip,
+    waiters are woken up by ``unlock_notifier``. The database lease still protects the Event across processes.
+
+    ``EVENT_LOCK_LOCAL=False`` disables this tier (every lock goes to the database).
+    """
+    def __init__(self):
+        self._held:Dict[int, str] = {}  # Event id -> lock owner token
+        self.local_acquired = 0
+        self.local_contended = 0
+        self.db_acquired = 0
+        self.db_contended = 0
+
+
+    def try_acquire(self, id:int, lock_owner_token:str) -> bool:
+        """
+        :return bool: ``False`` when the Event is held by another holder in this process.
+        """
+        if not settings.EVENT_LOCK_LOCAL:
+            return True
+
+        if id in self._held:
+            self.local_contended += 1
+            return False
+
+        self._held[id] = lock_owner_token
+        self.local_acquired += 1
+        return True
+
+
+    def release(self, id:int, lock_owner_token:str):
+        if self._held.get(id) == lock_owner_token:
+            del self._held[id]
+
+
+    def record_db(self, acquired:bool):
+        if acquired:
+            self.db_acquired += 1
+        else:
+            self.db_contended += 1
+
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "local": settings.EVENT_LOCK_LOCAL,
+            "held": len(self._held),
+            "local_acquired": self.local_acquired,
+            "local_contended": self.local_contended,
+            "db_acquired": self.db_acquired,
+            "db_contended": self.db_contended,
+            "listening": unlock_notifier.listening,
+        }
+
+
+unlock_notifier = UnlockNotifier()
+local_event_locks = LocalEventLocks()
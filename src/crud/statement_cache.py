@@ -0,0 +1,33 @@
+from typing import Any, Callable, Dict
+import functools
+
+# hot statements are built once (with bind parameters) and reused
+# - no Python overhead of building large statements (CTEs, case(), ...) on every call
+# - the same statement object hits SQLAlchemy's compiled cache, and the same SQL hits asyncpg's prepared statement cache
+_builders:Dict[str, Any] = {}
+
+def cached_statement(func:Callable) -> Callable:
+    """
+    Cache the statement returned by ``func`` for every combination of arguments.
+
+    Arguments must be hashable and only describe the *shape* of the statement (for example: ``type``, ``archived``),
+    values must be passed as bind parameters when executing the statement.
+    """
+    cached = functools.lru_cache(maxsize=None)(func)
+    _builders[f"{func.__module__}.{func.__qualname__}"] = cached
+    return cached
+
+
+def statement_cache_info() -> Dict[str, Dict[str, int]]:
+    """
+    :return Dict[str, Dict[str, int]]: ``{builder: {"hits": ..., "misses": ..., "size": ...}}``
+    """
+    result = {}
+    for name, builder in _builders.items():
+        info = builder.cache_info()
+        result[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+        }
+    return result
@@ -5,6 +5,22 @@ from sqlalchemy.orm import selectinload
 import sqlalchemy
 
 from src.database.model import User, Status, Skills, RhythmGames
+from src.crud.statement_cache import cached_statement
+from src.crud.event_cache import event_cache
+from src.crud.data_version import data_version
+
+# cached statements (see src.crud.statement_cache)
+@cached_statement
+def _read_user_stmt(by_discord_id:bool) -> sqlalchemy.Select:
+    # bind parameters: target_discord_id (by_discord_id)
+    stmt = sqlalchemy.select(User) \
+        .options(selectinload(User.events))
+    
+    if by_discord_id:
+        stmt = stmt.where(User.discord_id == sqlalchemy.bindparam("target_discord_id"))
+    
+    return stmt
+
 
 # create
 async def create_user(session:AsyncSession, discord_id:int) -> User:
@@ -27,12 +43,11 @@ async def create_user(session:AsyncSession, discord_id:int) -> User:
     
     # execute
     try:
-        result = (await session.execute(stmt)).scalar_one()
-        await session.flush()
-        await session.refresh(result)
-        return result
+        return (await session.execute(stmt)).scalar_one()
     except Exception:
         raise
+    finally:
+        data_version.bump(session)
 
 
 # read
@@ -48,15 +63,12 @@ async def read_user(session:AsyncSession, discord_id:Optional[int]=None) -> List
     :raise (Exception from sqlalchemy):
     """
     # stmt
-    stmt = sqlalchemy.select(User) \
-        .options(selectinload(User.events))
-    
-    if discord_id is not None:
-        stmt = stmt.where(User.discord_id == discord_id)
+    stmt = _read_user_stmt(discord_id is not None)
+    params = {"target_discord_id": discord_id} if discord_id is not None else {}
     
     # execute
     try:
-        return (await session.execute(stmt)).scalars().all()
+        return (await session.execute(stmt, params)).scalars().all()
     except Exception:
         raise
 
@@ -98,13 +110,15 @@ async def update_user(
     stmt = sqlalchemy.update(User) \
         .where(User.discord_id == discord_id) \
         .values(args) \
-        .returning(User)
+        .returning(User) \
+        .execution_options(populate_existing=True)  # RETURNING overwrites the User in the identity map (no refresh)
     
     # execute
     try:
-        result = (await session.execute(stmt)).scalar_one()
-        await session.flush()
-        await session.refresh(result)
-        return result
+        return (await session.execute(stmt)).scalar_one()
     except Exception:
-        raise
\ No newline at end of file
+        raise
+    finally:
+        # cached Events contain their Users
+        event_cache.invalidate_user(session, discord_id)
+        data_version.bump(session)
\ No newline at end of file
@@ -1,14 +1,98 @@
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import bisect
+import logging
+import time
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import sqlalchemy
 
 from src.config import settings
 from src.database.model import Base
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-)
+# logging
+logger = logging.getLogger("uvicorn")
+
+# pool metrics
+class PoolMetrics:
+    # checkout latency histogram buckets (upper bounds, in seconds)
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    
+    def __init__(self):
+        self.waiting = 0        # coroutines which are checking out a connection now
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.histogram:List[int] = [0] * (len(self.BUCKETS) + 1)    # the last bucket is +Inf
+    
+    
+    def observe(self, seconds:float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.histogram[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+    
+    
+    def stats(self, engine:AsyncEngine) -> Dict[str, Any]:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_histogram": {
+                **{f"le_{b}": n for b, n in zip(self.BUCKETS, self.histogram[:-1], strict=True)},
+                "le_inf": self.histogram[-1],
+            },
+        }
+
+
+def _instrumented_pool_class(metrics:PoolMetrics) -> type:
+    # Pool.recreate() uses self.__class__, so the metrics survive engine.dispose()
+    class InstrumentedPool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            metrics.waiting += 1
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except PoolTimeoutError:
+                metrics.timeouts += 1
+                raise
+            finally:
+                metrics.waiting -= 1
+            
+            # only successful checkouts are counted (timeouts have their own counter)
+            metrics.observe(time.perf_counter() - start)
+            return conn
+    
+    return InstrumentedPool
+
+
+def _create_engine(metrics:PoolMetrics, pool_size:int, max_overflow:int, url:Optional[str]=None) -> AsyncEngine:
+    return create_async_engine(
+        settings.DATABASE_URL if url is None else url,
+        echo=False,
+        poolclass=_instrumented_pool_class(metrics),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    )
+
+
+# engines
+engine_metrics = PoolMetrics()
+engine = _create_engine(engine_metrics, settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW)
+
+bgtask_engine_metrics = PoolMetrics()
+bgtask_engine = _create_engine(bgtask_engine_metrics, settings.DATABASE_BGTASK_POOL_SIZE, settings.DATABASE_BGTASK_MAX_OVERFLOW)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -16,15 +100,158 @@ AsyncSessionLocal = async_sessionmaker(
     class_=AsyncSession
 )
 
+BGTaskSessionLocal = async_sessionmaker(
+    bgtask_engine,
+    expire_on_commit=False,
+    class_=AsyncSession
+)
+
+# read replica (optional)
+read_engine_metrics = PoolMetrics()
+read_engine:Optional[AsyncEngine] = None
+ReadSessionLocal:Optional[async_sessionmaker] = None
+if settings.DATABASE_READ_URL is not None:
+    read_engine = _create_engine(read_engine_metrics, settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW, settings.DATABASE_READ_URL)
+    ReadSessionLocal = async_sessionmaker(
+        read_engine,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        info={"replica": True}
+    )
+
+read_replica_state:Dict[str, Any] = {
+    "available": False,
+    "lag_seconds": None,
+    "checked_at": None,     # time.monotonic()
+    "fallbacks": 0,
+}
+
+# replay lag of a PostgreSQL standby (0 when everything received was replayed, NULL on a primary)
+_REPLICA_LAG_STMT = sqlalchemy.text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+async def _check_read_replica() -> bool:
+    # check at most every DATABASE_READ_CHECK_INTERVAL_SECONDS
+    if read_engine is None:
+        return False
+    
+    now = time.monotonic()
+    if read_replica_state["checked_at"] is not None and \
+            now - read_replica_state["checked_at"] < settings.DATABASE_READ_CHECK_INTERVAL_SECONDS:
+        return read_replica_state["available"]
+    read_replica_state["checked_at"] = now
+    
+    try:
+        async with read_engine.connect() as conn:
+            if read_engine.dialect.name == "postgresql":
+                lag = (await conn.execute(_REPLICA_LAG_STMT)).scalar_one_or_none()
+            else:
+                lag = None
+                await conn.execute(sqlalchemy.text("SELECT 1"))
+    except Exception as e:
+        if read_replica_state["available"] or read_replica_state["lag_seconds"] is None:
+            logger.warning(f"read replica is unavailable, reading from the primary: {str(e)}")
+        read_replica_state["available"] = False
+        return False
+    
+    read_replica_state["lag_seconds"] = float(lag) if lag is not None else 0.0
+    read_replica_state["available"] = read_replica_state["lag_seconds"] <= settings.DATABASE_READ_MAX_LAG_SECONDS
+    if not read_replica_state["available"]:
+        logger.warning(f"read replica is {read_replica_state["lag_seconds"]:.1f}s behind, reading from the primary")
+    return read_replica_state["available"]
+
+
+async def _new_read_session() -> AsyncSession:
+    if await _check_read_replica():
+        return ReadSessionLocal()
+    
+    if read_engine is not None:
+        read_replica_state["fallbacks"] += 1
+    return AsyncSessionLocal()
+
+# with_get_db() in background tasks uses the bgtask pool (tasks created inside inherit the context)
+_use_bgtask_pool:ContextVar[bool] = ContextVar("use_bgtask_pool", default=False)
+
+@contextmanager
+def bgtask_pool():
+    token = _use_bgtask_pool.set(True)
+    try:
+        yield
+    finally:
+        _use_bgtask_pool.reset(token)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return {
+        "api": engine_metrics.stats(engine),
+        "bgtask": bgtask_engine_metrics.stats(bgtask_engine),
+        **({
+            "read": read_engine_metrics.stats(read_engine),
+            "read_replica": {k: v for k, v in read_replica_state.items() if k != "checked_at"},
+        } if read_engine is not None else {}),
+    }
+
+
+async def dispose_engines():
+    await engine.dispose()
+    await bgtask_engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+
 # initialize database
+def _create_indexes(conn):
+    # create_all() only creates indexes together with new tables
+    # create indexes which were added to existing tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _fix_indexes(conn):
+    # partial indexes which were created with "archived IS false" (the queries use "archived = false", so they were never used)
+    # drop them, _create_indexes() creates them again
+    if conn.dialect.name != "postgresql":
+        return
+    
+    rows = conn.execute(sqlalchemy.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'events' AND indexdef ILIKE '%archived IS FALSE%'"
+    )).all()
+    for row in rows:
+        logger.info(f"recreate index {row.indexname} (predicate changed)")
+        conn.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS \"{row.indexname}\""))
+
+
+def _add_columns(conn):
+    # create_all() doesn't add columns to existing tables
+    if conn.dialect.name != "postgresql":
+        return
+    
+    conn.execute(sqlalchemy.text(
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS participant_count INTEGER NOT NULL DEFAULT 0"
+    ))
+    
+    # backfill (and repair) participant_count
+    conn.execute(sqlalchemy.text(
+        "UPDATE events SET participant_count = c.n "
+        "FROM (SELECT events.id AS id, count(user_event.event_db_id) AS n "
+        "FROM events LEFT JOIN user_event ON user_event.event_db_id = events.id GROUP BY events.id) AS c "
+        "WHERE events.id = c.id AND events.participant_count <> c.n"
+    ))
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_columns)
+        await conn.run_sync(_fix_indexes)
+        await conn.run_sync(_create_indexes)
 
 # get database session
 @asynccontextmanager
 async def with_get_db():
-    session = AsyncSessionLocal()
+    session = BGTaskSessionLocal() if _use_bgtask_pool.get() else AsyncSessionLocal()
     try:
         yield session
     finally:
@@ -37,3 +264,23 @@ async def fastapi_get_db():
         yield session
     finally:
         await session.close()
+
+
+# get read-only database session
+# read replica (DATABASE_READ_URL) if it is available and not too far behind, otherwise the primary
+# only for reads which can tolerate a few seconds of staleness (don't read your own writes with it)
+@asynccontextmanager
+async def with_get_read_db():
+    session = await _new_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+async def fastapi_get_read_db():
+    session = await _new_read_session()
+    try:
+        yield session
+    finally:
+        await session.close()
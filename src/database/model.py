@@ -6,7 +6,9 @@ from sqlalchemy import (
     Enum, ARRAY,
     Table, Column,
     ForeignKey,
-    CheckConstraint
+    CheckConstraint,
+    Index,
+    and_
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -119,7 +121,9 @@ user_event = Table(
     "user_event",
     Base.metadata,
     Column("user_discord_id", ForeignKey("users.discord_id", ondelete="RESTRICT"), primary_key=True),
-    Column("event_db_id", ForeignKey("events.id", ondelete="RESTRICT"), primary_key=True)
+    Column("event_db_id", ForeignKey("events.id", ondelete="RESTRICT"), primary_key=True),
+    # primary key is (user_discord_id, event_db_id), it can't be used to find the users of an event
+    Index("ix_user_event_event_db_id", "event_db_id")
 )
 
 # User
@@ -175,7 +179,41 @@ class Event(Base):
         secondary=user_event,
         back_populates="events"
     )
+    # len(users), maintained by crud.join_event() / crud.delete_user_in_event() in the same statement
+    participant_count:Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     
     # challenge: todo
 
+
+# indexes for hot queries
+# read_event_many(type="ctftime") - WHERE event_id IS NOT NULL ORDER BY finish DESC, id DESC
+Index(
+    "ix_events_ctftime_finish_id",
+    Event.finish, Event.id,
+    postgresql_where=Event.event_id.isnot(None)
+)
+
+# read_ctfime_events_need_archive, read_event_many(archived=False) - WHERE archived = false AND finish ...
+# the predicate must be written like the queries (archived = false, not archived IS false), or PostgreSQL can't use the index
+Index(
+    "ix_events_unarchived_finish",
+    Event.finish,
+    postgresql_where=Event.archived == False  # noqa: E712
+)
+
+# hot rows only (archived Events stay in the table, but not in these indexes)
+# read_event_many(type="ctftime", archived=False) - bgtask loop and EventMenu
+Index(
+    "ix_events_ctftime_unarchived_finish_id",
+    Event.finish, Event.id,
+    postgresql_where=and_(Event.event_id.isnot(None), Event.archived == False)  # noqa: E712
+)
+
+# read_event_many(type="custom", archived=False) - EventMenu
+Index(
+    "ix_events_custom_unarchived_id",
+    Event.id,
+    postgresql_where=and_(Event.event_id.is_(None), Event.archived == False)  # noqa: E712
+)
+
 # challenge: todo
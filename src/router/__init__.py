@@ -2,4 +2,5 @@ from .auth import router as auth_router
 from .user import router as user_router
 from .ctf import router as ctf_router
 from .config import router as config_router
-from .guild import router as guild_router
\ No newline at end of file
+from .guild import router as guild_router
+from .metrics import router as metrics_router
\ No newline at end of file
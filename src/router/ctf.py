@@ -1,14 +1,15 @@
 from typing import Optional, List, Literal
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 import discord
 
-from src.database.database import fastapi_get_db
+from src.database.database import fastapi_get_read_db
 from src.backend import security
 from src.backend import channel_op
 from src.backend import event as event_backend
+from src.backend.response_cache import conditional_response, next_status_change
 from src.bot import get_guild
 from src import schema
 from src import crud
@@ -39,11 +40,12 @@ async def create_custom_event(
 # read
 @router.get("/ctftime")
 async def read_all_ctftime_event(
+    request:Request,
     archived:Optional[bool]=None,
     limit:int=Query(gt=0, le=20),
     finish_before:Optional[int]=Query(ge=0, default=None),
     before_id:Optional[int]=Query(ge=0, default=None),
-    session:AsyncSession=Depends(fastapi_get_db),
+    session:AsyncSession=Depends(fastapi_get_read_db),
     member:discord.Member=Depends(security.fastapi_check_user),
 ) -> List[schema.Event]:
     # argument check
@@ -52,56 +54,64 @@ async def read_all_ctftime_event(
     if first_page == False and n_page == False:
         raise HTTPException(400, "invalid finish_before and before_id")
     
-    # get events from database
-    try:
-        events_db = await crud.read_event_many(
-            session=session,
-            type="ctftime",
-            archived=archived,
-            limit=limit,
-            finish_after=None,
-            finish_before=finish_before,
-            before_id=before_id
-        )
-    except Exception as e:
-        logger.error(f"fail to read Events from database: {str(e)}")
-        raise HTTPException(500, "fail to read Events from database")
+    async def render():
+        # get events from database
+        try:
+            events_db = await crud.read_event_many(
+                session=session,
+                type="ctftime",
+                archived=archived,
+                limit=limit,
+                finish_after=None,
+                finish_before=finish_before,
+                before_id=before_id
+            )
+        except Exception as e:
+            logger.error(f"fail to read Events from database: {str(e)}")
+            raise HTTPException(500, "fail to read Events from database")
+        
+        # format
+        events = await event_backend.format_event(get_guild(), events_db)
+        return events, next_status_change(events)
     
-    # format and return
-    return (await event_backend.format_event(get_guild(), events_db))
+    return (await conditional_response(request, session, render))
 
 
 @router.get("/custom")
 async def read_all_custom_event(
+    request:Request,
     archived:Optional[bool]=None,
     limit:int=Query(gt=0, le=20),
     before_id:Optional[int]=Query(ge=0, default=None),
-    session:AsyncSession=Depends(fastapi_get_db),
+    session:AsyncSession=Depends(fastapi_get_read_db),
     member:discord.Member=Depends(security.fastapi_check_user),
 ) -> List[schema.Event]:
-    # get events from database
-    try:
-        events_db = await crud.read_event_many(
-            session=session,
-            type="custom",
-            archived=archived,
-            limit=limit,
-            finish_after=None,
-            finish_before=None,
-            before_id=before_id
-        )
-    except Exception as e:
-        logger.error(f"fail to read Events from database: {str(e)}")
-        raise HTTPException(500, "fail to read Events from database")
+    async def render():
+        # get events from database
+        try:
+            events_db = await crud.read_event_many(
+                session=session,
+                type="custom",
+                archived=archived,
+                limit=limit,
+                finish_after=None,
+                finish_before=None,
+                before_id=before_id
+            )
+        except Exception as e:
+            logger.error(f"fail to read Events from database: {str(e)}")
+            raise HTTPException(500, "fail to read Events from database")
+        
+        # format (custom Events don't have now_running)
+        return (await event_backend.format_event(get_guild(), events_db)), None
     
-    # format and return
-    return (await event_backend.format_event(get_guild(), events_db))
+    return (await conditional_response(request, session, render))
 
 
 @router.get("/{event_db_id}")
 async def read_event(
     event_db_id:int,
-    session:AsyncSession=Depends(fastapi_get_db),
+    session:AsyncSession=Depends(fastapi_get_read_db),
     member:discord.Member=Depends(security.fastapi_check_user)
 ) -> schema.Event:
     # get event from database
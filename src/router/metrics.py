@@ -0,0 +1,31 @@
+from typing import Dict, Any
+import logging
+
+from fastapi import APIRouter, Depends
+import discord
+
+from src.backend.security import fastapi_check_administrator, auth_cache
+from src.backend.response_cache import response_cache
+from src.database import database
+from src.utils import ctf_api
+from src import crud
+
+# logger
+logger = logging.getLogger("uvicorn")
+
+# router
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/")
+async def read_metrics(
+    member:discord.Member=Depends(fastapi_check_administrator)
+) -> Dict[str, Any]:
+    return {
+        "ctftime": ctf_api.cache_stats(),
+        "event_lock": crud.local_event_locks.stats(),
+        "event_cache": crud.event_cache.stats(),
+        "auth_cache": auth_cache.stats(),
+        "response_cache": {**response_cache.stats(), "data_version": crud.data_version.version},
+        "statement_cache": crud.statement_cache_info(),
+        "database_pool": database.pool_stats(),
+    }
@@ -1,13 +1,14 @@
 from typing import Optional, List
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 import discord
 
 from src.backend.security import fastapi_check_user
-from src.database.database import fastapi_get_db
+from src.database.database import fastapi_get_db, fastapi_get_read_db
 from src.backend import user
+from src.backend.response_cache import conditional_response, next_status_change
 from src import schema
 
 # logger
@@ -23,16 +24,22 @@ router = APIRouter(prefix="/user", tags=["User"])
 
 @router.get("/")
 async def read_all_user(
-    session:AsyncSession=Depends(fastapi_get_db),
+    request:Request,
+    session:AsyncSession=Depends(fastapi_get_read_db),
     member:discord.Member=Depends(fastapi_check_user)
 ) -> List[schema.User]:
-    return (await user.get_user(session))
+    async def render():
+        users = await user.get_user(session)
+        # Events of Users have now_running
+        return users, next_status_change(e for u in users for e in u.events)
+    
+    return (await conditional_response(request, session, render))
 
 
 @router.get("/{discord_id}")
 async def read_user(
     discord_id:int,
-    session:AsyncSession=Depends(fastapi_get_db),
+    session:AsyncSession=Depends(fastapi_get_db),   # read right after PATCH /user/, don't read it from a lagging replica
     member:discord.Member=Depends(fastapi_check_user)
 ) -> schema.User:
     return (await user.get_user(session, discord_id))[0]
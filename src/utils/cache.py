@@ -0,0 +1,96 @@
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from collections import OrderedDict
+import time
+
+class TTLCache:
+    """
+    A bounded in-process LRU cache whose entries expire after ``ttl`` seconds.
+
+    Not thread-safe, it is only used in the event loop.
+    """
+    def __init__(self, maxsize:int, ttl:float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data:OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+
+    def get(self, key:Hashable, default:Any=None) -> Any:
+        """
+        :return Any: The value, or ``default`` when the key is missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+    def set(self, key:Hashable, value:Any, ttl:Optional[float]=None):
+        """
+        :param key:
+        :param value:
+        :param ttl: Override the default ``ttl`` of the cache (in seconds).
+        """
+        if self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+    def delete(self, key:Hashable):
+        self._data.pop(key, None)
+
+
+    def clear(self):
+        self._data.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total != 0 else 0.0,
+        }
+
+
+    def dump(self) -> List[Tuple[Hashable, float, Any]]:
+        """
+        :return List[Tuple[Hashable, float, Any]]: Non-expired entries as ``(key, expires_at, value)``, least recently used first.
+        """
+        now = time.time()
+        return [(k, expires_at, v) for k, (expires_at, v) in self._data.items() if expires_at > now]
+
+
+    def load(self, items:List[Tuple[Hashable, float, Any]]):
+        """
+        Load entries from ``dump()``. Existing entries win, loaded entries are treated as least recently used.
+        """
+        now = time.time()
+        for key, expires_at, value in reversed(items):
+            if expires_at <= now or key in self._data:
+                continue
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key, last=False)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
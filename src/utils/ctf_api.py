@@ -1,10 +1,16 @@
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Set, Any, Tuple, Callable, AsyncIterator
 from datetime import datetime, timezone
+import asyncio
 import logging
+import random
+import time
 
+from asyncio_throttle import Throttler
 import aiohttp
 
 from src.config import settings
+from src.utils.cache import TTLCache
+from src.utils.disk_cache import DiskCache
 
 # logging
 logger = logging.getLogger(__name__)
@@ -21,40 +27,373 @@ async def init_session():
 
 async def close_session():
     global session
+    await flush_disk_cache()
     if session is not None and not session.closed:
         await session.close()
 
 
+# rate limit, retry and circuit breaker
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Open after ``threshold`` consecutive failures. After ``cooldown`` seconds it's half-open:
+    one request (the probe) is let through, and concurrent requests are still rejected until the probe succeeds (closed) or fails (open again).
+    """
+    def __init__(self, threshold:int, cooldown:float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at:Optional[float] = None
+        self.probe_started_at:Optional[float] = None
+
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+
+    def allow_request(self) -> bool:
+        """
+        :return bool: ``False`` when the request must be short-circuited.
+        """
+        if self.opened_at is None:
+            return True
+        if self.is_open():
+            return False
+        
+        # half-open
+        # a probe which never reported back (for example: cancelled) is given up after another cooldown
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.cooldown:
+            return False
+        self.probe_started_at = now
+        return True
+
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started_at = None
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.error(f"CTFTime API failed {self.failures} times in a row, circuit opened for {self.cooldown}s")
+            self.opened_at = time.monotonic()
+
+
+# cache
+# (url, params) -> {"payload", "etag", "last_modified", "fresh_until"}
+# - entries with validators (ETag / Last-Modified) are revalidated with conditional requests
+# - entries without validators are served until "fresh_until" (CTFTIME_RESPONSE_CACHE_TTL_SECONDS)
+response_cache = TTLCache(settings.CTFTIME_RESPONSE_CACHE_SIZE, settings.CTFTIME_RESPONSE_CACHE_MAX_AGE_SECONDS)
+response_cache_stats = {"ttl_hits": 0, "not_modified": 0, "misses": 0}
+
+# team_id -> (country, name)
+team_cache = TTLCache(settings.CTFTIME_TEAM_CACHE_SIZE, settings.CTFTIME_TEAM_CACHE_TTL_SECONDS)
+team_inflight:Dict[int, asyncio.Task] = {}
+
+
+# disk cache (optional)
+# loaded lazily on the first request, flushed by the background task and on shutdown
+disk_cache:Optional[DiskCache] = DiskCache(settings.CTFTIME_CACHE_PATH) if settings.CTFTIME_CACHE_PATH is not None else None
+disk_cache_loaded = False
+disk_cache_lock = asyncio.Lock()
+
+async def _load_disk_cache():
+    global disk_cache_loaded
+    if disk_cache is None or disk_cache_loaded:
+        return
+    
+    async with disk_cache_lock:
+        if disk_cache_loaded:
+            return
+        disk_cache_loaded = True
+        try:
+            response_cache.load(await disk_cache.load("response"))
+            team_cache.load([(k, expires_at, tuple(v)) for k, expires_at, v in (await disk_cache.load("team"))])
+            logger.info(f"CTFTime cache loaded from {disk_cache.path} (response={len(response_cache)}, team={len(team_cache)})")
+        except Exception as e:
+            logger.error(f"fail to load CTFTime cache from {disk_cache.path}: {str(e)}")
+
+
+async def flush_disk_cache():
+    if disk_cache is None or not disk_cache_loaded:
+        # nothing new, or we would overwrite the file with an empty cache
+        return
+    
+    async with disk_cache_lock:
+        try:
+            await disk_cache.save("response", response_cache.dump())
+            await disk_cache.save("team", team_cache.dump())
+        except Exception as e:
+            logger.error(f"fail to flush CTFTime cache to {disk_cache.path}: {str(e)}")
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "response": {
+            **response_cache_stats,
+            "size": len(response_cache),
+        },
+        "team": team_cache.stats(),
+        "circuit_open": circuit_breaker.is_open(),
+    }
+
+
+# rate limit
+throttler = Throttler(rate_limit=settings.CTFTIME_API_RATE_LIMIT, period=settings.CTFTIME_API_RATE_PERIOD)
+circuit_breaker = CircuitBreaker(settings.CTFTIME_API_CIRCUIT_THRESHOLD, settings.CTFTIME_API_CIRCUIT_COOLDOWN_SECONDS)
+
+async def _get(url:str, params:Optional[Dict[str, Any]], headers:Dict[str, str]) -> Tuple[int, Any, Any]:
+    async with session.get(url, params=params, headers=headers) as response:
+        if response.status == 200:
+            return response.status, await response.json(), response.headers
+        return response.status, None, response.headers
+
+
+async def _request_json(url:str, params:Optional[Dict[str, Any]]=None) -> Tuple[int, Any]:
+    """
+    Send a GET request to CTFTime (rate limited, retry on 5xx, 429 and timeouts with jittered exponential backoff).
+    
+    :param url:
+    :param params:
+    
+    :return int: HTTP status.
+    :return Any: Decoded JSON (only when status is 200).
+    
+    :raise CircuitOpenError: CTFTime API is unavailable.
+    :raise RuntimeError:
+    """
+    # response cache
+    await _load_disk_cache()
+    key = (url, tuple(sorted((params or {}).items())))
+    headers:Dict[str, str] = {}
+    if (cached := response_cache.get(key)) is not None:
+        if cached["fresh_until"] > time.time():
+            # no validators from the server -> TTL hit
+            response_cache_stats["ttl_hits"] += 1
+            return 200, cached["payload"]
+        if cached["etag"] is not None:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"] is not None:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError("CTFTime API is unavailable (circuit open)")
+    
+    cached_payload = cached.get("payload") if cached is not None else None
+    unconditional = False
+    
+    last_error:str = ""
+    for attempt in range(settings.CTFTIME_API_MAX_RETRIES + 1):
+        if attempt != 0:
+            # full jitter
+            await asyncio.sleep(random.uniform(0, min(
+                settings.CTFTIME_API_BACKOFF_MAX_SECONDS,
+                settings.CTFTIME_API_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1))
+            )))
+        
+        try:
+            async with throttler:
+                status, payload, response_headers = await _get(url, params, headers)
+                if status == 304 and cached_payload is None and not unconditional:
+                    # 304 without a cached payload to return (for example: a stale entry from the disk cache)
+                    # it isn't a failure of CTFTime, ask again once without validators
+                    unconditional = True
+                    headers = {"Cache-Control": "no-cache"}
+                    status, payload, response_headers = await _get(url, params, headers)
+            
+            if status >= 500 or status == 429:
+                last_error = f"API returned {status}"
+                continue
+            circuit_breaker.record_success()
+            
+            if status == 304 and cached_payload is not None:
+                # not modified -> return the parsed payload without decoding
+                response_cache_stats["not_modified"] += 1
+                response_cache.set(key, cached)
+                return 200, cached_payload
+            
+            response_cache_stats["misses"] += 1
+            if status != 200:
+                return status, None
+            
+            etag = response_headers.get("ETag")
+            last_modified = response_headers.get("Last-Modified")
+            if etag is not None or last_modified is not None or settings.CTFTIME_RESPONSE_CACHE_TTL_SECONDS > 0:
+                response_cache.set(key, {
+                    "payload": payload,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "fresh_until": (
+                        time.time() + settings.CTFTIME_RESPONSE_CACHE_TTL_SECONDS
+                        if etag is None and last_modified is None else 0
+                    )
+                })
+            return 200, payload
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            last_error = f"{type(e).__name__}: {str(e)}"
+    
+    circuit_breaker.record_failure()
+    raise RuntimeError(f"{last_error} (url={url}, after {settings.CTFTIME_API_MAX_RETRIES + 1} attempts)")
+
+
 # functions
 async def fetch_ctf_events(event_id:Optional[int]=None) -> List[Dict[str, Any]]:
-    params = {
-        "limit": 20, # todo 考慮加入一個參數，讓系統會一直索取直到 start 到達這個參數
-        "start": int(datetime.now(timezone.utc).timestamp())
-    }
+    # use iter_ctf_events() to get more than one page of events
+    params = None
     
     url = settings.CTFTIME_API_EVENT
     if event_id is not None:
         # for example: "https://ctftime.org/api/v1/events/2345/"
         url = f"{url}{event_id}/"
+    else:
+        params = {
+            "limit": settings.CTFTIME_API_PAGE_LIMIT,
+            "start": int(datetime.now(timezone.utc).timestamp())
+        }
     
-    async with session.get(url, params=params) as response:
-        if response.status == 200:
-            if event_id is not None:
-                return [await response.json()]
-            return (await response.json())
-        elif response.status == 404:
-            return []
-        else:
-            raise RuntimeError(f"API returned {response.status} (with event_id={event_id})")
+    status, payload = await _request_json(url, params)
+    if status == 200:
+        if event_id is not None:
+            return [payload]
+        return payload
+    elif status == 404:
+        return []
+    else:
+        raise RuntimeError(f"API returned {status} (with event_id={event_id})")
+
+
+async def iter_ctf_events(
+    start:Optional[int]=None,
+    finish:Optional[int]=None,
+    horizon_days:Optional[int]=None,
+    page_size:Optional[int]=None,
+    max_pages:Optional[int]=None,
+    stop:Optional[Callable[[Dict[str, Any]], bool]]=None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream CTF events from CTFTime page by page.
+
+    CTFTime doesn't support offset, so we page by moving ``start`` to the last ``start`` we got.
+    Events which were yielded in previous pages are not yielded again.
+
+    :param start: Timestamp, ``None`` for now (rounded down to ``CTFTIME_API_START_GRANULARITY_SECONDS``).
+    :param finish: Timestamp, ``None`` for ``start`` + ``horizon_days``.
+    :param horizon_days: Only used when ``finish`` is ``None`` (default: ``CTFTIME_API_HORIZON_DAYS``).
+    :param page_size: Events per request (default: ``CTFTIME_API_PAGE_LIMIT``).
+    :param max_pages: Max requests (default: ``CTFTIME_API_MAX_PAGES``).
+    :param stop: Stop streaming at the first event which ``stop(event)`` returns ``True`` (the event is not yielded).
+
+    :return AsyncIterator[List[Dict[str, Any]]]: Pages of events (never empty).
+
+    :raise RuntimeError:
+    """
+    # arguments
+    if start is None:
+        # round down, so the same listing has the same cache key for a while
+        start = int(datetime.now(timezone.utc).timestamp())
+        start -= start % settings.CTFTIME_API_START_GRANULARITY_SECONDS
+    if finish is None:
+        if horizon_days is None:
+            horizon_days = settings.CTFTIME_API_HORIZON_DAYS
+        finish = start + horizon_days * 24 * 60 * 60
+    if page_size is None:
+        page_size = settings.CTFTIME_API_PAGE_LIMIT
+    if max_pages is None:
+        max_pages = settings.CTFTIME_API_MAX_PAGES
 
+    seen:Set[int] = set()
+    cursor = start
+    for _ in range(max_pages):
+        params = {
+            "limit": page_size,
+            "start": cursor,
+            "finish": finish
+        }
+        status, page = await _request_json(settings.CTFTIME_API_EVENT, params)
+        if status != 200:
+            raise RuntimeError(f"API returned {status} (with start={cursor}, finish={finish})")
 
-async def fetch_team_info(team_id) -> Tuple[Optional[str], Optional[str]]:
+        result = []
+        stopped = False
+        for event in page:
+            if stop is not None and stop(event):
+                stopped = True
+                break
+            if event["id"] not in seen:
+                seen.add(event["id"])
+                result.append(event)
+
+        if len(result) != 0:
+            yield result
+
+        if stopped or len(page) < page_size:
+            return
+
+        # next page
+        next_cursor = max(int(datetime.fromisoformat(event["start"]).timestamp()) for event in page)
+        if next_cursor <= cursor:
+            # more than one page of events start at the same time, stop here
+            return
+        cursor = next_cursor
+
+
+async def fetch_ctf_events_window(start:int, finish:int) -> List[Dict[str, Any]]:
+    """
+    Fetch all CTF events between ``start`` and ``finish`` (timestamps) from CTFTime.
+
+    The result may be incomplete when it hits ``CTFTIME_API_MAX_PAGES``, so callers should fall back
+    to ``fetch_ctf_events(event_id)`` for the events they can't find in the result.
+
+    :param start:
+    :param finish:
+
+    :return List[Dict[str, Any]]: A list of events (deduplicated by ``id``).
+
+    :raise RuntimeError:
+    """
+    events:List[Dict[str, Any]] = []
+    async for page in iter_ctf_events(start=start, finish=finish):
+        events.extend(page)
+    return events
+
+
+async def _fetch_team_info(team_id:int) -> Tuple[Optional[str], Optional[str]]:
     url = f"{settings.CTFTIME_API_TEAM}{team_id}/"
+    result:Tuple[Optional[str], Optional[str]] = (None, None)
+    ttl:Optional[float] = settings.CTFTIME_TEAM_CACHE_NEGATIVE_TTL_SECONDS
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                team_data = await response.json()
-                return team_data.get("country"), team_data.get("name")
+        status, team_data = await _request_json(url)
+        if status == 200:
+            result = (team_data.get("country"), team_data.get("name"))
+            ttl = None
+    except CircuitOpenError:
+        # don't cache, CTFTime is down
+        return result
     except Exception as e:
         logger.error(f"Error fetching team info: {e}")
-    return None, None
+    
+    # failures (404, errors) are cached with a shorter ttl (negative caching)
+    team_cache.set(team_id, result, ttl=ttl)
+    return result
+
+
+async def fetch_team_info(team_id:int) -> Tuple[Optional[str], Optional[str]]:
+    # cache
+    await _load_disk_cache()
+    if (cached := team_cache.get(team_id)) is not None:
+        return cached
+    
+    # share the in-flight request with concurrent callers
+    if (task := team_inflight.get(team_id)) is None:
+        task = asyncio.create_task(_fetch_team_info(team_id))
+        team_inflight[team_id] = task
+        task.add_done_callback(lambda _: team_inflight.pop(team_id, None))
+    return (await asyncio.shield(task))
@@ -0,0 +1,80 @@
+from typing import Any, Hashable, List, Tuple
+import json
+import logging
+import os
+import time
+
+import aiosqlite
+
+# logging
+logger = logging.getLogger("uvicorn")
+
+# utils
+def _to_hashable(obj:Any) -> Any:
+    # JSON turns tuples into lists, turn them back (cache keys are tuples)
+    if isinstance(obj, list):
+        return tuple(_to_hashable(o) for o in obj)
+    return obj
+
+
+# disk cache
+class DiskCache:
+    """
+    Persist ``TTLCache.dump()`` to a SQLite file, one namespace per cache.
+
+    Keys and values are stored as JSON, so tuples come back as tuples only in keys.
+    """
+    def __init__(self, path:str):
+        self.path = path
+
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if (d := os.path.dirname(self.path)) != "":
+            os.makedirs(d, exist_ok=True)
+        db = await aiosqlite.connect(self.path)
+        await db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "value TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        return db
+
+
+    async def load(self, namespace:str) -> List[Tuple[Hashable, float, Any]]:
+        """
+        :return List[Tuple[Hashable, float, Any]]: Non-expired entries as ``(key, expires_at, value)``.
+
+        :raise (Exception from aiosqlite):
+        """
+        db = await self._connect()
+        try:
+            async with db.execute(
+                "SELECT key, expires_at, value FROM cache WHERE namespace = ? AND expires_at > ? ORDER BY expires_at",
+                (namespace, time.time())
+            ) as cursor:
+                rows = await cursor.fetchall()
+        finally:
+            await db.close()
+
+        return [(_to_hashable(json.loads(k)), expires_at, json.loads(v)) for k, expires_at, v in rows]
+
+
+    async def save(self, namespace:str, items:List[Tuple[Hashable, float, Any]]):
+        """
+        Replace all entries of the namespace.
+
+        :raise (Exception from aiosqlite):
+        """
+        db = await self._connect()
+        try:
+            await db.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            await db.executemany(
+                "INSERT INTO cache (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+                [(namespace, json.dumps(k), expires_at, json.dumps(v)) for k, expires_at, v in items]
+            )
+            await db.commit()
+        finally:
+            await db.close()
@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import pytz
 import logging
@@ -17,9 +18,16 @@ async def create_event_embed(event, title:str):
     organizer_info = []
     first_country_flag = ""
     if event.get("organizers"):
-        for i, org in enumerate(event["organizers"][:3]):
+        organizers = event["organizers"][:3]
+        teams_info = await asyncio.gather(
+            *[fetch_team_info(org["id"]) for org in organizers],
+            return_exceptions=True
+        )
+        for i, (org, team_info) in enumerate(zip(organizers, teams_info, strict=True)):
             try:
-                country_code, team_name = await fetch_team_info(org["id"])
+                if isinstance(team_info, BaseException):
+                    raise team_info
+                country_code, team_name = team_info
                 country_flag, country_name = get_country_info(country_code)
                 if i == 0:
                     first_country_flag = country_flag
@@ -4,7 +4,7 @@ from enum import Enum
 import discord
 
 from src.bot import get_guild
-from src.config import settings
+from src.config import settings, get_config
 
 async def send_notification(
     channel_id:Union[Literal["anno"], Optional[int]],
@@ -29,9 +29,10 @@ async def send_notification(
     
     # args
     if channel_id == "anno":
-        channel = guild.get_channel(settings.ANNOUNCEMENT_CHANNEL_ID)
+        config = get_config()
+        channel = guild.get_channel(config.ANNOUNCEMENT_CHANNEL_ID)
         if channel is None:
-            raise RuntimeError(f"Announcement channel (id={settings.ANNOUNCEMENT_CHANNEL_ID}) not found")
+            raise RuntimeError(f"Announcement channel (id={config.ANNOUNCEMENT_CHANNEL_ID}) not found")
     else:
         if channel_id is None or (channel := guild.get_channel(channel_id)) is None:
             # ignore exception and return None